@@ -0,0 +1,192 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from metrics import Metrics
+from rate_limit import AdaptiveRateLimiter
+
+DEFAULT_HOST_CONCURRENCY = 32  # Requests in flight to one host at a time
+DEFAULT_CONNECTIONS = 100
+
+# Told every routed request's URL, status (None on failure), seconds to headers, final URL and redirect statuses
+Observer = Callable[[str, Optional[int], float, Optional[str], List[int]], None]
+
+def check_async() -> None:
+    """Raises ValueError unless httpx, which the async engine is built on, is installed."""
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        raise ValueError("The async engine needs the httpx package (pip install httpx, or httpx[http2])") from None
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _request_error(error: Exception) -> requests.exceptions.RequestException:
+    """The requests exception matching an httpx one, so callers and retries classify both alike."""
+    import httpx
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error) or type(error).__name__)
+    if isinstance(error, httpx.DecodingError):
+        return requests.exceptions.ContentDecodingError(str(error))
+    if isinstance(error, (httpx.RemoteProtocolError, httpx.ReadError)):
+        return requests.exceptions.ChunkedEncodingError(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(error))
+    return requests.exceptions.RequestException(str(error))
+
+def _to_response(response, content: bytes, ttfb: float) -> requests.Response:
+    """Wraps an httpx response as a requests.Response, so the HTTP cache and parsers take it unchanged."""
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.url = str(response.url)
+    converted.headers = CaseInsensitiveDict(response.headers.items())
+    converted.encoding = get_encoding_from_headers(converted.headers)
+    converted.elapsed = timedelta(seconds=ttfb)
+    converted._content = content
+    converted._content_consumed = True  # There is no raw stream behind it to close
+    return converted
+
+class StreamedResponse:
+    """Status and headers of a response whose body is read in chunks with aiter_content()."""
+
+    def __init__(self, response, ttfb: float, errors: type):
+        self.response = _to_response(response, b"", ttfb)
+        self.status_code = response.status_code
+        self.headers = self.response.headers
+        self._stream = response
+        self._errors = errors
+
+    def raise_for_status(self) -> None:
+        self.response.raise_for_status()
+
+    async def aiter_content(self, chunk_size: int) -> AsyncIterator[bytes]:
+        try:
+            async for data in self._stream.aiter_bytes(chunk_size):
+                yield data
+        except self._errors as e:
+            raise _request_error(e) from e
+
+class AsyncHttpClient:
+    """One shared httpx.AsyncClient behind the scraper's rate limiter and per-host semaphores.
+
+    Connections are pooled across every task and multiplexed over HTTP/2 when the server and
+    the optional h2 package allow it. Responses come back as requests.Response objects and
+    failures as requests exceptions, so the async path handles them exactly like the sync one.
+    route picks where each URL is sent and observe, if given, hears how it went.
+    Must be created and used inside one running event loop.
+    """
+
+    def __init__(self, rate_limiter: AdaptiveRateLimiter, metrics: Metrics, route: Callable[[str], str] = str,
+                 host_concurrency: int = DEFAULT_HOST_CONCURRENCY, connections: int = DEFAULT_CONNECTIONS,
+                 headers: Optional[Dict[str, str]] = None, observe: Optional[Observer] = None):
+        import httpx
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.route = route
+        self.observe = observe
+        self.host_concurrency = max(1, host_concurrency)
+        self.http2 = http2_available()
+        self._client = httpx.AsyncClient(
+            http2=self.http2, follow_redirects=True, headers=headers,
+            limits=httpx.Limits(max_connections=max(1, connections), max_keepalive_connections=max(1, connections)),
+        )
+        self._errors = httpx.HTTPError
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.host_concurrency)
+        return semaphore
+
+    async def _wait_turn(self, url: str) -> None:
+        start = time.perf_counter()
+        while True:
+            delay = self.rate_limiter.reserve(url)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        self.metrics.stage("rate_limit_wait", time.perf_counter() - start)
+
+    async def _open(self, url: str, headers: Optional[Dict[str, str]], timeout: Optional[float],
+                    allow_redirects: bool, method: str = "GET"):
+        """Sends a request and returns the response with only its headers read, and the time that took."""
+        request = self._client.build_request(method, url, headers=headers, timeout=timeout)
+        start = time.monotonic()
+        try:
+            response = await self._client.send(request, stream=True, follow_redirects=allow_redirects)
+        except self._errors as e:
+            self.rate_limiter.record(url, time.monotonic() - start)
+            if self.observe is not None:
+                self.observe(url, None, time.monotonic() - start, None, [])
+            self.metrics.count("responses", "error")
+            raise _request_error(e) from e
+        ttfb = time.monotonic() - start
+        self.rate_limiter.record(url, ttfb, response.status_code, response.headers.get("Retry-After"))
+        if self.observe is not None:
+            self.observe(url, response.status_code, ttfb, str(response.url), [r.status_code for r in response.history])
+        self.metrics.count("responses", str(response.status_code))
+        self.metrics.stage("ttfb", ttfb)
+        return response, ttfb
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                  allow_redirects: bool = True) -> requests.Response:
+        """GETs url at the rate the host tolerates and returns the whole response."""
+        url = self.route(url)
+        async with self._semaphore(url):
+            await self._wait_turn(url)
+            response, ttfb = await self._open(url, headers, timeout, allow_redirects)
+            start = time.perf_counter()
+            try:
+                content = await response.aread()
+            except self._errors as e:
+                raise _request_error(e) from e
+            finally:
+                await response.aclose()
+            self.metrics.stage("download", time.perf_counter() - start)
+        return _to_response(response, content, ttfb)
+
+    async def head(self, url: str, headers: Optional[Dict[str, str]] = None,
+                   timeout: Optional[float] = None) -> requests.Response:
+        """Sends a HEAD request for url and returns its status and headers."""
+        url = self.route(url)
+        async with self._semaphore(url):
+            await self._wait_turn(url)
+            response, ttfb = await self._open(url, headers, timeout, True, "HEAD")
+            await response.aclose()
+        return _to_response(response, b"", ttfb)
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[StreamedResponse]:
+        """GETs url for reading in chunks; the host's semaphore is held until the body is read."""
+        url = self.route(url)
+        async with self._semaphore(url):
+            await self._wait_turn(url)
+            response, ttfb = await self._open(url, headers, timeout, True)
+            try:
+                yield StreamedResponse(response, ttfb, self._errors)
+            finally:
+                await response.aclose()
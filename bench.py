@@ -0,0 +1,165 @@
+"""End-to-end benchmark of the scraper against the offline replay server in mock_server.py.
+
+Measures browse page fetches (get_movie_links), detail page fetches (get_movie_details) and a
+full f1.main run, and reports pages/sec, movies/sec, p50/p99 latency and peak RSS. Save a run
+with --save and compare later runs against it with --baseline.
+
+Usage: python bench.py [--pages N] [--latency MS] [--error-rate P] [--save FILE] [--baseline FILE]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import f1
+from log import setup_logging
+from mirrors import MirrorPool
+
+HERE = Path(__file__).resolve().parent
+
+# Metrics where a larger value is the improvement; for the others smaller is better
+HIGHER_IS_BETTER = ("links_pages_per_sec", "details_movies_per_sec", "crawl_pages_per_sec", "crawl_movies_per_sec")
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where the resource module is missing."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+def start_replay_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Runs mock_server.py in its own process so it does not compete with the scraper for the GIL."""
+    command = [sys.executable, str(HERE / "mock_server.py"), "--port", "0", "--pages", str(args.pages),
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--seed", str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r"at (http://\S+) with", process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("Replay server did not start")
+    return process, match.group(1)
+
+def timed(func: Callable[[], object]) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def bench_links(pages: int) -> Tuple[Dict[str, float], List[str]]:
+    """Fetches every browse page in turn; returns the metrics and the movie links found."""
+    latencies, links = [], []
+    base = f1.BROWSE_URL_TEMPLATE.format(genre="animation", order="downloads")
+    for page in range(1, pages + 1):
+        found, elapsed = timed(lambda: f1.get_movie_links(f1.page_url(base, page)))
+        latencies.append(elapsed)
+        links.extend(found or [])
+    total = sum(latencies)
+    return {
+        "links_pages_per_sec": pages / total if total else 0.0,
+        "links_p50_ms": percentile(latencies, 50) * 1000,
+        "links_p99_ms": percentile(latencies, 99) * 1000,
+    }, links
+
+def bench_details(links: List[str]) -> Dict[str, float]:
+    """Fetches and parses each detail page in turn."""
+    latencies = [timed(lambda: f1.get_movie_details(link))[1] for link in links]
+    total = sum(latencies)
+    return {
+        "details_movies_per_sec": len(links) / total if total else 0.0,
+        "details_p50_ms": percentile(latencies, 50) * 1000,
+        "details_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def bench_crawl(base_url: str, args: argparse.Namespace) -> Dict[str, float]:
+    """A complete f1.main run, torrent downloads included, in a scratch folder."""
+    previous = Path.cwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            argv = ["--site-url", base_url, "--max-rps", "0", "--no-cache", "--workers", str(args.workers),
+                    "--parser", args.parser]
+            stats, elapsed = timed(lambda: f1.main(argv))
+        finally:
+            os.chdir(previous)
+    if stats is None:  # f1.main has already logged why, e.g. a bad option or config file
+        raise SystemExit("The benchmark crawl failed; rerun with --verbose to see why.")
+    return {
+        "crawl_seconds": elapsed,
+        "crawl_pages_per_sec": stats.pages / elapsed,
+        "crawl_movies_per_sec": stats.movies / elapsed,
+        "crawl_downloaded": stats.downloaded,
+        "crawl_failed": stats.failed,
+    }
+
+def compare(results: Dict[str, float], baseline: Dict[str, float]) -> None:
+    print(f"\n{'metric':<24} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, value in results.items():
+        before = baseline.get(name)
+        if not isinstance(before, (int, float)) or not before:
+            continue
+        change = (value - before) / before * 100
+        better = change > 0 if name in HIGHER_IS_BETTER else change < 0
+        marker = "" if abs(change) < 5 else (" better" if better else " WORSE")
+        print(f"{name:<24} {before:>12.2f} {value:>12.2f} {change:>+8.1f}%{marker}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against the local replay server.")
+    parser.add_argument("--pages", type=int, default=5, help="browse pages in the replayed catalog (default: 5)")
+    parser.add_argument("--latency", type=float, default=20.0, help="server latency per response in ms (default: 20)")
+    parser.add_argument("--jitter", type=float, default=10.0, help="random extra latency in ms (default: 10)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency jitter and errors (default: 0)")
+    parser.add_argument("--workers", type=int, default=f1.DEFAULT_WORKERS,
+                        help=f"detail workers for the full crawl (default: {f1.DEFAULT_WORKERS})")
+    parser.add_argument("--parser", default=f1.DEFAULT_BACKEND, help=f"HTML parser backend (default: {f1.DEFAULT_BACKEND})")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    parser.add_argument("--save", type=Path, default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=None, help="compare against results saved with --save")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(args)
+    print(f"Replay server: {base_url} ({args.pages} pages, {args.latency:g}+{args.jitter:g} ms, "
+          f"{args.error_rate:.0%} errors)")
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            setup_logging()  # Until f1.main configures it, so the fetch benchmarks log like a crawl
+            f1.mirrors = MirrorPool([base_url], f1.SITE_URL)
+            f1.parser_backend = args.parser
+            f1.rate_limiter.set_rate(0)
+            results, links = bench_links(args.pages)
+            results.update(bench_details(links))
+            results.update(bench_crawl(base_url, args))
+    finally:
+        server.kill()
+        server.wait()
+    results["peak_rss_mb"] = peak_rss_mb() or 0.0
+
+    for name, value in results.items():
+        print(f"{name:<24} {value:>12.2f}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+if __name__ == "__main__":
+    main()
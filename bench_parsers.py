@@ -0,0 +1,57 @@
+"""Micro-benchmark of the HTML parser backends on the saved pages in fixtures/.
+
+Usage: python bench_parsers.py [--rounds N]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from parsers import available_backends, extract_movie_details, extract_movie_links
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+BROWSE_FIXTURES = ["browse.html"]
+REFERENCE_BACKEND = "html.parser"  # Full BeautifulSoup tree; every other backend must match it
+DETAIL_FIXTURES = {
+    "toy-story-1995.html": "https://yts.mx/movies/toy-story-1995",
+    "up-2009.html": "https://yts.mx/movies/up-2009",
+}
+
+def _time_per_call(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on fixture pages.")
+    parser.add_argument("--rounds", type=int, default=200, help="parses per page and backend (default: 200)")
+    args = parser.parse_args()
+
+    browse_pages = {name: (FIXTURES / name).read_bytes() for name in BROWSE_FIXTURES}
+    detail_pages = {name: ((FIXTURES / name).read_bytes(), url) for name, url in DETAIL_FIXTURES.items()}
+
+    # Every backend must produce exactly what the reference html.parser backend produces
+    expected_links = {name: extract_movie_links(page, REFERENCE_BACKEND) for name, page in browse_pages.items()}
+    expected_details = {name: extract_movie_details(page, url, REFERENCE_BACKEND)
+                        for name, (page, url) in detail_pages.items()}
+
+    print(f"{'backend':<12} {'browse ms/page':>15} {'detail ms/page':>15} {'speedup':>8}  output")
+    baseline = None
+    for backend in available_backends():
+        matches = all(extract_movie_links(page, backend) == expected_links[name]  # Same links in the same order
+                      for name, page in browse_pages.items())
+        matches = matches and all(extract_movie_details(page, url, backend) == expected_details[name]
+                                  for name, (page, url) in detail_pages.items())
+        browse_time = sum(_time_per_call(lambda: extract_movie_links(page, backend), args.rounds)
+                          for page in browse_pages.values()) / len(browse_pages)
+        detail_time = sum(_time_per_call(lambda: extract_movie_details(page, url, backend), args.rounds)
+                          for page, url in detail_pages.values()) / len(detail_pages)
+        total = browse_time + detail_time
+        if backend == REFERENCE_BACKEND:
+            baseline = total
+        speedup = f"{baseline / total:.1f}x" if baseline else "-"
+        print(f"{backend:<12} {browse_time * 1000:>15.3f} {detail_time * 1000:>15.3f} {speedup:>8}  "
+              f"{'matches' if matches else 'DIFFERS'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import hashlib
+from typing import Any, Tuple
+
+def _decode(data: bytes, index: int) -> Tuple[Any, int]:
+    """Decodes the value starting at index and returns it with the index just past it."""
+    if index >= len(data):
+        raise ValueError("unexpected end of data")
+    token = data[index:index + 1]
+    if token == b"i":
+        end = data.index(b"e", index)
+        return int(data[index + 1:end]), end + 1
+    if token == b"l":
+        index += 1
+        items = []
+        while data[index:index + 1] != b"e":
+            item, index = _decode(data, index)
+            items.append(item)
+        return items, index + 1
+    if token == b"d":
+        index += 1
+        items = {}
+        while data[index:index + 1] != b"e":
+            key, index = _decode(data, index)
+            if not isinstance(key, bytes):
+                raise ValueError("dictionary key is not a string")
+            items[key], index = _decode(data, index)
+        return items, index + 1
+    if token.isdigit():
+        colon = data.index(b":", index)
+        start = colon + 1
+        end = start + int(data[index:colon])
+        if end > len(data):
+            raise ValueError("string runs past the end of data")
+        return data[start:end], end
+    raise ValueError(f"invalid token {token!r} at offset {index}")
+
+def decode(data: bytes) -> Any:
+    """Decodes a complete bencoded value, raising ValueError if data is malformed or truncated."""
+    try:
+        value, end = _decode(data, 0)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Malformed bencode: {e}") from None
+    if end != len(data):
+        raise ValueError(f"Malformed bencode: {len(data) - end} trailing bytes")
+    return value
+
+def encode(value: Any) -> bytes:
+    """Bencodes ints, bytes/str, lists and dicts (keys are sorted as the format requires)."""
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(encode(item) for item in value) + b"e"
+    if isinstance(value, dict):
+        items = sorted((k.encode("utf-8") if isinstance(k, str) else k, v) for k, v in value.items())
+        return b"d" + b"".join(encode(k) + encode(v) for k, v in items) + b"e"
+    raise TypeError(f"Cannot bencode {type(value).__name__}")
+
+def info_hash(torrent: bytes) -> str:
+    """Validates a .torrent file and returns the upper-case hex SHA-1 of its info dictionary."""
+    metainfo = decode(torrent)
+    if not isinstance(metainfo, dict) or not isinstance(metainfo.get(b"info"), dict):
+        raise ValueError("Torrent has no info dictionary")
+    # Hash the info dictionary exactly as it appears in the file, not a re-encoding of it
+    index = 1
+    while torrent[index:index + 1] != b"e":
+        key, index = _decode(torrent, index)
+        start = index
+        _, index = _decode(torrent, index)
+        if key == b"info":
+            return hashlib.sha1(torrent[start:index]).hexdigest().upper()
+    raise ValueError("Torrent has no info dictionary")
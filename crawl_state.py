@@ -0,0 +1,236 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Per-URL crawl states
+DISCOVERED = "discovered"
+LISTED = "listed"  # Browse pages whose movie links have been recorded
+DETAILS_PARSED = "details_parsed"
+TORRENT_DOWNLOADED = "torrent_downloaded"
+MAGNET_EXPORTED = "magnet_exported"  # Magnet link recorded instead of downloading the torrent
+SKIPPED = "skipped"  # Parsed, but nothing on the page matches the selection spec
+FAILED = "failed"
+DEAD_LETTER = "dead_letter"  # Out of attempts; left alone until the dead-letter queue is drained
+
+DEFAULT_MAX_ATTEMPTS = 5  # Failed runs a URL may take part in before it is dead-lettered
+
+PAGE = "page"
+MOVIE = "movie"
+
+# States of movies an earlier run finished; --probe re-checks their detail pages
+FINISHED = (TORRENT_DOWNLOADED, MAGNET_EXPORTED, SKIPPED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    title TEXT,
+    download_link TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    magnet TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_length INTEGER,
+    discovered_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_kind_state ON urls (kind, state);
+"""
+
+class CrawlState:
+    """SQLite store remembering what each browse page and movie URL has been through."""
+
+    def __init__(self, path: Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(urls)")}
+            if "attempts" not in columns:  # Databases created before attempt budgets existed
+                self._conn.execute("ALTER TABLE urls ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            if "magnet" not in columns:
+                self._conn.execute("ALTER TABLE urls ADD COLUMN magnet TEXT")
+            for name, kind in (("etag", "TEXT"), ("last_modified", "TEXT"), ("content_length", "INTEGER")):
+                if name not in columns:  # Databases created before probe mode
+                    self._conn.execute(f"ALTER TABLE urls ADD COLUMN {name} {kind}")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(params)).fetchall()
+            self._conn.commit()
+            return rows
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Returns the stored row for a URL, or None if it was never seen."""
+        rows = self._execute("SELECT * FROM urls WHERE url = ?", (url,))
+        return dict(rows[0]) if rows else None
+
+    def is_page_listed(self, url: str) -> bool:
+        row = self.get(url)
+        return bool(row) and row["state"] == LISTED
+
+    def mark_page_listed(self, url: str) -> None:
+        now = time.time()
+        self._execute(
+            "INSERT INTO urls (url, kind, state, discovered_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET state = excluded.state, error = NULL, attempts = 0, "
+            "updated_at = excluded.updated_at",
+            (url, PAGE, LISTED, now, now),
+        )
+
+    def discover(self, urls: Iterable[str]) -> List[str]:
+        """Records movie URLs and returns the ones that were not known before."""
+        now = time.time()
+        new_urls = []
+        with self._lock:
+            for url in urls:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO urls (url, kind, state, discovered_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, MOVIE, DISCOVERED, now, now),
+                )
+                if cursor.rowcount:
+                    new_urls.append(url)
+            self._conn.commit()
+        return new_urls
+
+    def is_finished(self, url: str) -> bool:
+        row = self.get(url)
+        return bool(row) and row["state"] in FINISHED
+
+    def finished_movies(self, urls: Iterable[str]) -> List[str]:
+        """The movie URLs among urls that an earlier run finished, in their given order."""
+        urls = list(urls)
+        finished = set()
+        for start in range(0, len(urls), 500):  # Stays under SQLite's bound-parameter limit
+            batch = urls[start:start + 500]
+            rows = self._execute(
+                f"SELECT url FROM urls WHERE state IN (?, ?, ?) AND url IN ({', '.join('?' * len(batch))})",
+                (*FINISHED, *batch),
+            )
+            finished.update(row["url"] for row in rows)
+        return [url for url in urls if url in finished]
+
+    def iter_pending_movies(self, batch_size: int = 1000) -> Iterator[str]:
+        """Movie URLs left unfinished by earlier runs, oldest first.
+
+        Read batch_size rows at a time, so a huge backlog is never held in memory.
+        """
+        last_rowid = 0
+        while True:
+            rows = self._execute(
+                "SELECT rowid, url FROM urls WHERE kind = ? AND state IN (?, ?, ?) AND rowid > ? ORDER BY rowid LIMIT ?",
+                (MOVIE, DISCOVERED, DETAILS_PARSED, FAILED, last_rowid, batch_size),
+            )
+            for row in rows:
+                yield row["url"]
+            if len(rows) < batch_size:
+                return
+            last_rowid = rows[-1]["rowid"]
+
+    def count_pending_movies(self) -> int:
+        rows = self._execute("SELECT COUNT(*) AS n FROM urls WHERE kind = ? AND state IN (?, ?, ?)",
+                             (MOVIE, DISCOVERED, DETAILS_PARSED, FAILED))
+        return rows[0]["n"]
+
+    def mark_details(self, url: str, title: str, download_link: Optional[str]) -> None:
+        self._execute(
+            "UPDATE urls SET state = ?, title = ?, download_link = ?, error = NULL, updated_at = ? WHERE url = ?",
+            (DETAILS_PARSED, title, download_link, time.time(), url),
+        )
+
+    def validators(self, url: str) -> Optional[Dict[str, Any]]:
+        """The ETag, Last-Modified and length recorded for url's page, or None if none were."""
+        rows = self._execute("SELECT etag, last_modified, content_length FROM urls WHERE url = ?", (url,))
+        if not rows or all(value is None for value in tuple(rows[0])):
+            return None
+        return dict(rows[0])
+
+    def set_validators(self, url: str, validators: Dict[str, Any]) -> None:
+        self._execute(
+            "UPDATE urls SET etag = ?, last_modified = ?, content_length = ? WHERE url = ?",
+            (validators.get("etag"), validators.get("last_modified"), validators.get("content_length"), url),
+        )
+
+    def mark_downloaded(self, url: str) -> None:
+        self._execute(
+            "UPDATE urls SET state = ?, error = NULL, attempts = 0, updated_at = ? WHERE url = ?",
+            (TORRENT_DOWNLOADED, time.time(), url),
+        )
+
+    def mark_exported(self, url: str, magnet: str) -> None:
+        """Stores the movie's magnet link; the state and the link are committed together."""
+        self._execute(
+            "UPDATE urls SET state = ?, magnet = ?, error = NULL, attempts = 0, updated_at = ? WHERE url = ?",
+            (MAGNET_EXPORTED, magnet, time.time(), url),
+        )
+
+    def exported_magnets(self) -> Iterator[str]:
+        """The magnet links recorded so far, one per info-hash, in the order the movies were discovered.
+
+        Rows are streamed from a cursor of their own and SQLite drops the repeated hashes, so
+        memory use does not grow with the crawl. Of several movies with one release, the link
+        recorded for the first one discovered is kept.
+        """
+        conn = sqlite3.connect(str(self.path))
+        try:
+            # magnet_uri puts the 40-character hash right after the first urn:btih:
+            yield from (row[0] for row in conn.execute(
+                "SELECT magnet, MIN(discovered_at) AS first_seen FROM urls WHERE state = ? "
+                "GROUP BY upper(substr(magnet, instr(magnet, 'urn:btih:') + 9, 40)) ORDER BY first_seen",
+                (MAGNET_EXPORTED,)))
+        finally:
+            conn.close()
+
+    def mark_skipped(self, url: str, reason: str) -> None:
+        self._execute(
+            "UPDATE urls SET state = ?, error = ?, updated_at = ? WHERE url = ?",
+            (SKIPPED, reason, time.time(), url),
+        )
+
+    def mark_failed(self, url: str, error: str, kind: str = MOVIE, fatal: bool = False) -> str:
+        """Counts a failed attempt and returns the new state; fatal or exhausted URLs are dead-lettered."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO urls (url, kind, state, discovered_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO NOTHING",
+                (url, kind, FAILED, now, now),
+            )
+            attempts = self._conn.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()[0] + 1
+            state = DEAD_LETTER if fatal or attempts >= self.max_attempts else FAILED
+            self._conn.execute(
+                "UPDATE urls SET state = ?, error = ?, attempts = ?, updated_at = ? WHERE url = ?",
+                (state, error, attempts, now, url),
+            )
+            self._conn.commit()
+        return state
+
+    def dead_letters(self) -> List[Dict[str, str]]:
+        """URLs that ran out of attempts, with their last error."""
+        rows = self._execute("SELECT url, kind, error, attempts, updated_at FROM urls WHERE state = ? ORDER BY updated_at",
+                             (DEAD_LETTER,))
+        return [dict(row) for row in rows]
+
+    def drain_dead_letters(self) -> int:
+        """Gives every dead-lettered URL a fresh attempt budget; returns how many were released."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE urls SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+                (FAILED, time.time(), DEAD_LETTER),
+            )
+            self._conn.commit()
+            return cursor.rowcount
@@ -0,0 +1,124 @@
+import csv
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+FORMATS = ("jsonl", "csv", "parquet")
+DEFAULT_BATCH_SIZE = 500  # Records held in memory before they are written out
+
+# One CSV row per torrent option, with the movie's fields repeated on each row
+CSV_FIELDS = ["url", "title", "year", "rating", "genres", "runtime", "download_link",
+              "quality", "codec", "type", "size_mb", "seeds", "peers", "hash", "torrent_url"]
+TORRENT_FIELDS = ("quality", "codec", "type", "size_mb", "seeds", "peers", "url", "hash")
+
+def check_formats(formats: List[str]) -> None:
+    """Raises ValueError for an unknown format, or for parquet without pyarrow installed."""
+    for name in formats:
+        if name not in FORMATS:
+            raise ValueError(f"Unknown export format: {name} (choose from {', '.join(FORMATS)})")
+    if "parquet" in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)") from None
+
+def movie_record(url: str, details: Dict[str, Any]) -> Dict[str, Any]:
+    """The exported form of a movie's details: everything but tracker lists and magnet links."""
+    return {
+        "url": url,
+        "title": details.get("title"),
+        "year": details.get("year"),
+        "rating": details.get("rating"),
+        "genres": details.get("genres") or [],
+        "runtime": details.get("runtime"),
+        "download_link": details.get("download_link"),
+        "torrents": [{field: torrent.get(field) for field in TORRENT_FIELDS} for torrent in details.get("torrents") or []],
+    }
+
+def csv_rows(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    movie = {field: record[field] for field in ("url", "title", "year", "rating", "runtime", "download_link")}
+    movie["genres"] = "/".join(record["genres"])
+    torrents = record["torrents"] or [{}]  # Movies without torrents still get a row
+    return [dict(movie, torrent_url=torrent.get("url"),
+                 **{field: torrent.get(field) for field in TORRENT_FIELDS if field != "url"})
+            for torrent in torrents]
+
+def _parquet_schema():
+    import pyarrow as pa
+    torrent = pa.struct([
+        ("quality", pa.string()), ("codec", pa.string()), ("type", pa.string()), ("size_mb", pa.float64()),
+        ("seeds", pa.int64()), ("peers", pa.int64()), ("url", pa.string()), ("hash", pa.string()),
+    ])
+    return pa.schema([
+        ("url", pa.string()), ("title", pa.string()), ("year", pa.int64()), ("rating", pa.float64()),
+        ("genres", pa.list_(pa.string())), ("runtime", pa.int64()), ("download_link", pa.string()),
+        ("torrents", pa.list_(torrent)),
+    ])
+
+class MetadataExporter:
+    """Streams movie records to JSONL, CSV and/or Parquet files in fixed-size batches.
+
+    Only one batch is ever held in memory. JSONL and CSV files are appended to across runs;
+    Parquet files cannot be appended to, so each run writes its own file into the folder,
+    one row group per batch, and the folder can be read back as a single dataset.
+    """
+
+    def __init__(self, folder: Path, formats: List[str], batch_size: int = DEFAULT_BATCH_SIZE):
+        check_formats(formats)
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.formats = list(formats)
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self._lock = threading.Lock()
+        self._batch: List[Dict[str, Any]] = []
+        self._jsonl = self._csv = self._csv_file = self._parquet = None
+        if "jsonl" in self.formats:
+            self._jsonl = open(self.folder / "movies.jsonl", "a", encoding="utf-8")
+        if "csv" in self.formats:
+            path = self.folder / "movies.csv"
+            new_file = not path.exists() or path.stat().st_size == 0
+            self._csv_file = open(path, "a", encoding="utf-8", newline="")
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=CSV_FIELDS)
+            if new_file:
+                self._csv.writeheader()
+        if "parquet" in self.formats:
+            import pyarrow.parquet as pq
+            self.parquet_path = self.folder / f"movies-{time.strftime('%Y%m%d-%H%M%S')}.parquet"
+            self._parquet = pq.ParquetWriter(str(self.parquet_path), _parquet_schema())
+
+    def add(self, url: str, details: Dict[str, Any]) -> None:
+        """Queues one movie for export, writing the batch out once it is full."""
+        with self._lock:
+            self._batch.append(movie_record(url, details))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._batch:
+            return
+        if self._jsonl is not None:
+            self._jsonl.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self._batch))
+            self._jsonl.flush()
+        if self._csv is not None:
+            self._csv.writerows(row for record in self._batch for row in csv_rows(record))
+            self._csv_file.flush()
+        if self._parquet is not None:
+            import pyarrow as pa
+            self._parquet.write_table(pa.Table.from_pylist(self._batch, schema=_parquet_schema()))
+        self.written += len(self._batch)
+        self._batch = []
+
+    def close(self) -> None:
+        """Writes the last partial batch and closes every file."""
+        with self._lock:
+            self._flush()
+            for handle in (self._jsonl, self._csv_file, self._parquet):
+                if handle is not None:
+                    handle.close()
+            self._jsonl = self._csv = self._csv_file = self._parquet = None
+
+    def summary(self) -> str:
+        return f"{self.written} movies exported as {', '.join(self.formats)} to {self.folder}"
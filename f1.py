@@ -1,152 +1,1357 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 import time
 import re
+import argparse
+import asyncio
+import logging
+import threading
+import queue
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from rate_limit import AdaptiveRateLimiter
+from retry import DEFAULT_RETRIES, call_with_retries, call_with_retries_async, is_fatal
+import bencode
+from selection import SelectionSpec
+from magnet import magnet_uri, write_magnet_file
+from log import DEFAULT_PROGRESS_INTERVAL, LEVELS, LOGGER_NAME, ProgressReporter, log_context, setup_logging
+from metrics import Metrics, start_http_server as start_metrics_server
+from async_engine import DEFAULT_HOST_CONCURRENCY, AsyncHttpClient, check_async
+from mirrors import DEFAULT_PROBE_INTERVAL, MirrorPool
+from frontier import DEFAULT_MEMORY_MB as DEFAULT_FRONTIER_MB, FRONTIER_MODES, Frontier
+from work_queue import DEFAULT_LEASE, MOVIE_TASK, PAGE_TASK, Task, open_work_queue
+from export import DEFAULT_BATCH_SIZE, FORMATS as EXPORT_FORMATS, MetadataExporter, check_formats
+from torrent_store import TorrentStore, file_info_hash
+from crawl_state import DEFAULT_MAX_ATTEMPTS, FAILED, PAGE, CrawlState
+from probe import HEAD_UNSUPPORTED, PROBE_RANGE, response_validators, unchanged
+from http_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, HttpCache
+import yts_api
+from parsers import BACKENDS, DEFAULT_BACKEND, TORRENT_HASH_RE, check_backend, extract_movie_details, extract_movie_links, use_rules
 
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RPS = 2.0  # Per-host request rate, roughly what the old fixed sleeps allowed
+DEFAULT_CHUNK_SIZE = 64 * 1024  # Bytes read per iteration when streaming a torrent to disk
+MAX_FAILED_PAGES = 3  # Consecutive unreadable listing pages before pagination gives up
+DEFAULT_QUEUE_SIZE = 50
+
+SITE_URL = "https://yts.mx"
+BROWSE_URL_TEMPLATE = SITE_URL + "/browse-movies/0/all/{genre}/0/{order}/0/all"
+
+_STOP = None  # Sentinel telling a pipeline worker to exit
+WORKER_IDLE_POLL = 1.0  # Seconds a distributed worker waits when the shared queue has nothing to lease
+COORDINATOR_POLL = 5.0  # Seconds between the coordinator's queue reports
+
+rate_limiter = AdaptiveRateLimiter(DEFAULT_MAX_RPS)
+metrics = Metrics()  # Stage and call timings, summarized at the end of a run
+logger = logging.getLogger(LOGGER_NAME)
+progress = ProgressReporter(logger)  # Byte counts from download_torrent, reported by run_pipeline
+
+def _accept_encoding() -> str:
+    """Advertises brotli only when urllib3 can actually decode it."""
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+            return "gzip, deflate, br"
+        except ImportError:
+            continue
+    return "gzip, deflate"
+
+def create_session(pool_size: int) -> requests.Session:
+    """Builds a keep-alive session whose connection pool fits the worker count."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": _accept_encoding(), "Connection": "keep-alive"})
+    return session
+
+session = create_session(DEFAULT_WORKERS)
+
+def configure_session(pool_size: int) -> None:
+    """Replaces the shared session with one sized for pool_size concurrent requests."""
+    global session
+    session.close()
+    session = create_session(pool_size)
+
+http_cache: Optional[HttpCache] = None  # Set by main unless caching is disabled
+parser_backend = DEFAULT_BACKEND
+parse_pool: Optional[ProcessPoolExecutor] = None  # Set by main when --parse-processes is used
+request_retries = DEFAULT_RETRIES
+selection = SelectionSpec()  # Replaced by main when --spec is given
+chunk_size = DEFAULT_CHUNK_SIZE
+mirrors = MirrorPool([SITE_URL])  # Where requests for SITE_URL pages are actually sent; replaced by main
+output_mode = "torrent"  # "magnet" records magnet links instead of downloading torrent files
+probe_mode = False  # Set by main for --probe: re-check finished movies before fetching them again
+exporter: Optional[MetadataExporter] = None  # Set by main when --export is given
+frontier = Frontier()  # Replaced by main when --frontier disk is given
+async_client: Optional[AsyncHttpClient] = None  # Set by run_pipeline_async for the *_async fetch functions
+_torrent_stores: Dict[Path, TorrentStore] = {}
+_torrent_stores_lock = threading.Lock()
+
+def parse_content(extractor, *args):
+    """Runs an extractor in the parser process pool, or inline when there is none.
+
+    Only the raw page bytes go to the parser process and only the small result comes back,
+    so I/O threads never hold the GIL for a full HTML parse.
+    """
+    with metrics.timer("parse"):
+        if parse_pool is None:
+            return extractor(*args)
+        return parse_pool.submit(extractor, *args).result()
+
+async def parse_content_async(extractor, *args):
+    """parse_content for the async engine; other requests keep flowing while a pool process parses."""
+    with metrics.timer("parse"):
+        if parse_pool is None:
+            return extractor(*args)
+        return await asyncio.wrap_future(parse_pool.submit(extractor, *args))
+
+def route_url(url: str) -> str:
+    """Sends site URLs to the best mirror; movie URLs keep their canonical form everywhere else."""
+    return mirrors.route(url)
+
+def _send(url: str, method: str = "GET", **kwargs) -> requests.Response:
+    """Sends a request, a GET unless method says otherwise, at the rate the host currently tolerates."""
+    url = route_url(url)
+    with metrics.timer("rate_limit_wait"):
+        rate_limiter.acquire(url)
+    start = time.monotonic()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        rate_limiter.record(url, time.monotonic() - start)
+        mirrors.observe(url, None, time.monotonic() - start)
+        metrics.count("responses", "error")
+        raise
+    elapsed = time.monotonic() - start
+    rate_limiter.record(url, elapsed, response.status_code, response.headers.get("Retry-After"))
+    metrics.count("responses", str(response.status_code))
+    # requests times up to the parsed headers, so name resolution and connecting are part of it
+    ttfb = response.elapsed.total_seconds()
+    mirrors.observe(url, response.status_code, ttfb, response.url, [r.status_code for r in response.history])
+    metrics.stage("ttfb", ttfb)
+    if not kwargs.get("stream"):
+        metrics.stage("download", max(0.0, elapsed - ttfb))  # Streamed bodies are timed as they are read
+    return response
+
+def http_get(url: str, max_age: Optional[float] = None, **kwargs) -> requests.Response:
+    """Sends a rate-limited GET through the shared pooled session.
+
+    Non-streaming requests go through the HTTP cache when one is configured; max_age overrides
+    its TTL for this request.
+    """
+    if http_cache is None or kwargs.get("stream"):
+        return _send(url, **kwargs)
+    return http_cache.fetch(_send, url, max_age=max_age, **kwargs)
+
+def fetch(url: str, **kwargs) -> requests.Response:
+    """http_get that raises for HTTP errors and retries transient failures with backoff."""
+    def attempt() -> requests.Response:
+        response = http_get(url, **kwargs)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return response
+    return call_with_retries(attempt, url, request_retries)
+
+async def http_get_async(url: str, max_age: Optional[float] = None, **kwargs) -> requests.Response:
+    """http_get through the shared async client."""
+    if http_cache is None:
+        return await async_client.get(url, **kwargs)
+    return await http_cache.fetch_async(async_client.get, url, max_age=max_age, **kwargs)
+
+async def fetch_async(url: str, **kwargs) -> requests.Response:
+    """fetch through the shared async client; failures raise the same requests exceptions."""
+    async def attempt() -> requests.Response:
+        response = await http_get_async(url, **kwargs)
+        response.raise_for_status()
+        return response
+    return await call_with_retries_async(attempt, url, request_retries)
+
+def log_fetch_error(what: str, error: Exception, errors: Optional[List[Exception]] = None) -> None:
+    """Logs why fetching what failed, and adds the error to errors; the fetch functions then return None."""
+    if errors is not None:
+        errors.append(error)
+    if isinstance(error, requests.exceptions.RequestException):
+        logger.error("Error fetching %s: %s", what, error)
+    else:
+        logger.error("A general error occurred during %s fetching: %s", what, error)
+
+@metrics.timed
 def get_movie_links(url: str) -> Optional[List[str]]:
     """Retrieves all unique movie links from a given URL."""
     try:
-        response = requests.get(url, allow_redirects=True, timeout=10)  # Allow redirects, add timeout
-        response.raise_for_status()
-        print(f"Fetched URL: {response.url}") # Print the fetched URL for debugging
-        soup = BeautifulSoup(response.content, "html.parser")
-        links = []
-        for link in soup.find_all("a"):
-            href = link.get("href")
-            if href and href.startswith("https://yts.mx/movies/"):
-                links.append(href)
-        return list(set(links))
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching links: {e}")
+        # Listings change as movies are added, so always revalidate them with the server
+        response = fetch(url, max_age=0, allow_redirects=True, timeout=10)  # Allow redirects, add timeout
+        logger.debug("Fetched URL: %s", response.url)
+        return mirrors.site_links(parse_content(extract_movie_links, response.content, parser_backend))
+    except Exception as e:
+        log_fetch_error("links", e)
         return None
+
+@metrics.timed
+async def get_movie_links_async(url: str) -> Optional[List[str]]:
+    """get_movie_links on the async engine."""
+    try:
+        response = await fetch_async(url, max_age=0, allow_redirects=True, timeout=10)
+        logger.debug("Fetched URL: %s", response.url)
+        return mirrors.site_links(await parse_content_async(extract_movie_links, response.content, parser_backend))
     except Exception as e:
-        print(f"A general error occurred during link fetching: {e}")
+        log_fetch_error("links", e)
         return None
 
-def get_movie_details(url: str) -> Optional[Dict[str, str]]:
-    """Fetches movie details and 1080p download link."""
+def apply_selection(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Sets the record's download_link and magnet to the torrent the selection spec picks, or None.
+
+    Torrent URLs on a mirror are first moved to the canonical domain, like movie URLs.
+    """
+    if record is not None:
+        for torrent in record["torrents"]:
+            torrent["url"] = mirrors.normalize(torrent["url"])
+        choice = selection.choose(record["torrents"]) if selection.accepts_movie(record) else None
+        record["download_link"] = choice["url"] if choice else None
+        record["magnet"] = (magnet_uri(choice["hash"], record["title"], choice.get("trackers"))
+                            if choice and choice.get("hash") else None)
+    return record
+
+def details_record(response: requests.Response, details: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Parsed details with the selection applied and the page's validators attached, which the
+    crawl state keeps for --probe."""
+    details = apply_selection(details)
+    if details is not None:
+        details["validators"] = response_validators(response.status_code, response.headers)
+    return details
+
+@metrics.timed
+def get_movie_details(url: str, max_age: Optional[float] = None,
+                      errors: Optional[List[Exception]] = None) -> Optional[Dict[str, Any]]:
+    """Fetches movie details and the download link chosen by the selection spec.
+
+    max_age overrides the HTTP cache TTL; 0 makes the cache check with the server. The error a
+    failed fetch ended with is added to errors.
+    """
     try:
-        response = requests.get(url, timeout=10)  # Add timeout
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        response = fetch(url, max_age=max_age, timeout=10)  # Add timeout
+        return details_record(response, parse_content(extract_movie_details, response.content, url, parser_backend))
+    except Exception as e:
+        log_fetch_error("movie details", e, errors)
+        return None
 
-        title = None
-        title_tag = soup.find("h1", class_="title")
-        if title_tag:
-            title = title_tag.text.strip()
-        if not title:
-            try:
-                title = re.search(r"/movies/([^/]+)$", url).group(1).replace("-", " ").title()
-            except AttributeError:
-                print(f"Could not extract title from URL: {url}")
-                return None
-
-        download_link = None
-        download_section = soup.find("p", class_="hidden-md hidden-lg")
-        if download_section:
-            for link in download_section.find_all("a", rel="nofollow"):
-                href = link.get("href")
-                if href and href.startswith("https://yts.mx/torrent/download/"):
-                    text = link.text.strip().lower()
-                    if "1080p" in text:
-                        download_link = href
-                        break
-        return {"title": title, "download_link": download_link}
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching movie details: {e}")
+@metrics.timed
+async def get_movie_details_async(url: str, max_age: Optional[float] = None,
+                                  errors: Optional[List[Exception]] = None) -> Optional[Dict[str, Any]]:
+    """get_movie_details on the async engine."""
+    try:
+        response = await fetch_async(url, max_age=max_age, timeout=10)
+        return details_record(response, await parse_content_async(extract_movie_details, response.content, url,
+                                                                  parser_backend))
+    except Exception as e:
+        log_fetch_error("movie details", e, errors)
+        return None
+
+def api_listing(response: requests.Response) -> Dict[str, Dict[str, Any]]:
+    """Movie details keyed by movie URL from a list_movies API response."""
+    logger.debug("Fetched URL: %s", response.url)
+    return {mirrors.normalize(movie["url"]): apply_selection(yts_api.movie_details(movie))
+            for movie in yts_api.parse_list_movies(response.json()) if movie.get("url")}
+
+@metrics.timed
+def get_movie_listing_api(url: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Fetches one list_movies API page and returns movie details keyed by movie URL."""
+    try:
+        return api_listing(fetch(url, max_age=0, timeout=10))
+    except Exception as e:
+        log_fetch_error("movie listing", e)
         return None
+
+@metrics.timed
+async def get_movie_listing_api_async(url: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """get_movie_listing_api on the async engine."""
+    try:
+        return api_listing(await fetch_async(url, max_age=0, timeout=10))
     except Exception as e:
-        print(f"A general error occurred during movie detail fetching: {e}")
+        log_fetch_error("movie listing", e)
+        return None
+
+def probe_validators(response: requests.Response) -> Dict[str, Any]:
+    """The validators a probe response reports, raising for HTTP errors so the probe is retried."""
+    response.raise_for_status()
+    return response_validators(response.status_code, response.headers)
+
+@metrics.timed
+def probe_url(url: str) -> Optional[Dict[str, Any]]:
+    """The validators of url from a HEAD request, or from a one-byte Range GET where HEAD is refused.
+
+    None means the probe failed, so the page has to be fetched in full.
+    """
+    def attempt() -> Dict[str, Any]:
+        response = _send(url, "HEAD", timeout=10, allow_redirects=True)
+        if response.status_code in HEAD_UNSUPPORTED:
+            response = _send(url, stream=True, timeout=10, headers=PROBE_RANGE)
+        response.close()  # A server ignoring the Range header is cut off after the headers
+        return probe_validators(response)
+    try:
+        return call_with_retries(attempt, url, request_retries)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Could not probe %s: %s", url, e)
+        return None
+
+@metrics.timed
+async def probe_url_async(url: str) -> Optional[Dict[str, Any]]:
+    """probe_url on the async engine."""
+    async def attempt() -> Dict[str, Any]:
+        response = await async_client.head(url, timeout=10)
+        if response.status_code in HEAD_UNSUPPORTED:
+            async with async_client.stream(url, timeout=10, headers=PROBE_RANGE) as streamed:
+                response = streamed.response
+        return probe_validators(response)
+    try:
+        return await call_with_retries_async(attempt, url, request_retries)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Could not probe %s: %s", url, e)
         return None
 
-def download_torrent(url: str, title: str, download_folder: Path) -> bool:
-    """Downloads a torrent file."""
+Listing = Tuple[Optional[List[str]], Optional[Dict[str, Dict[str, Any]]]]
+
+def api_listing_result(listing: Optional[Dict[str, Dict[str, Any]]]) -> Listing:
+    return (None if listing is None else list(listing)), listing
+
+def fetch_listing(browse_url: str, engine: str = "html") -> Listing:
+    """Movie URLs on a listing page and, with the "api" engine, their details; None for failed fetches."""
+    if engine == "api":
+        return api_listing_result(get_movie_listing_api(browse_url))
+    return get_movie_links(browse_url), None
+
+async def fetch_listing_async(browse_url: str, engine: str = "html") -> Listing:
+    """fetch_listing on the async engine."""
+    if engine == "api":
+        return api_listing_result(await get_movie_listing_api_async(browse_url))
+    return await get_movie_links_async(browse_url), None
+
+def expected_info_hash(url: str) -> Optional[str]:
+    """Info-hash embedded in a YTS torrent download URL, if there is one."""
+    match = TORRENT_HASH_RE.search(url)
+    return match.group(1).upper() if match else None
+
+def verify_torrent(path: Path, expected_hash: Optional[str]) -> str:
+    """Returns the info-hash of path, raising ValueError unless it is a well-formed torrent with the expected one."""
+    actual_hash = bencode.info_hash(path.read_bytes())
+    if expected_hash and actual_hash != expected_hash:
+        raise ValueError(f"Info-hash mismatch: expected {expected_hash}, got {actual_hash}")
+    return actual_hash
+
+def get_torrent_store(download_folder: Path) -> TorrentStore:
+    """The shared TorrentStore for a download folder."""
+    key = Path(download_folder).resolve()
+    with _torrent_stores_lock:
+        if key not in _torrent_stores:
+            _torrent_stores[key] = TorrentStore(key)
+        return _torrent_stores[key]
+
+def torrent_title(title: str) -> str:
+    """The movie title reduced to characters that are safe in a file name."""
+    return re.sub(r"[^a-zA-Z0-9\s_\-\(\)]", "", title).strip()
+
+def store_torrent(store: TorrentStore, part_path: Path, expected_hash: Optional[str], safe_title: str, url: str) -> Path:
+    """Validates a finished .part file and stores it under its info-hash and the title."""
     try:
-        safe_title = re.sub(r"[^a-zA-Z0-9\s_\-\(\)]", "", title).strip()
-        filename = f"{safe_title}.torrent"
-        filepath = download_folder / filename
+        info_hash = verify_torrent(part_path, expected_hash)
+    except ValueError:
+        part_path.unlink(missing_ok=True)  # Corrupt data must not be resumed from
+        raise
+    if store.lookup(info_hash):
+        part_path.unlink()  # Same release as one reached through another URL
+        return store.link_title(info_hash, safe_title)
+    return store.add(part_path, info_hash, safe_title, url)
+
+class TorrentDownload:
+    """One torrent transfer, shared by the threaded and the async download paths.
+
+    The engines only send the request and feed the body to the part_writer(); picking up an
+    interrupted transfer, the answers to the Range request, the timings and the validation
+    before the torrent is stored live here.
+    """
 
-        if filepath.exists():
-            print(f"File already exists: {filename}")
+    def __init__(self, url: str, title: str, download_folder: Path):
+        self.url = url
+        self.safe_title = torrent_title(title)
+        self.filename = f"{self.safe_title}.torrent"
+        self.filepath = Path(download_folder) / self.filename
+        self.expected_hash = expected_info_hash(url)
+        self.store = get_torrent_store(download_folder)
+        self.part_key = self.expected_hash or self.safe_title
+        self.part_path: Optional[Path] = None
+        self.offset = 0
+
+    def stored(self) -> bool:
+        """Files an already stored release under the title; True means nothing has to be downloaded."""
+        if self.expected_hash and self.store.lookup(self.expected_hash):
+            path = self.store.link_title(self.expected_hash, self.safe_title)
+            logger.debug("Already have %s: %s", self.expected_hash, path.name)
             return True
 
-        print(f"\nDownloading: {filename}")
-        response = requests.get(url, stream=True, timeout=30)  # Add timeout
+        if self.filepath.exists():
+            # A file from before the info-hash index, or a different release with the same title
+            existing_hash = file_info_hash(self.filepath)
+            if existing_hash and (not self.expected_hash or existing_hash == self.expected_hash):
+                self.store.adopt(self.filepath, existing_hash, self.safe_title)
+                logger.debug("File already exists: %s", self.filename)
+                return True
+        logger.debug("Downloading: %s", self.filename)
+        return False
+
+    @contextmanager
+    def claimed_part(self) -> Iterator[Path]:
+        """Claims this transfer's own part file, leaving it for a later resume unless it was stored."""
+        self.part_path = self.store.claim_part(self.part_key)
+        try:
+            yield self.part_path
+        finally:
+            self.store.release_part(self.part_key, self.part_path)
+
+    def range_headers(self) -> Dict[str, str]:
+        """Headers resuming the transfer where an interrupted attempt (this run's or an earlier one's) stopped."""
+        self.offset = self.part_path.stat().st_size if self.part_path.exists() else 0
+        return {"Range": f"bytes={self.offset}-"} if self.offset else {}
+
+    def accept(self, response) -> bool:
+        """True when the body of the answer to range_headers() has to be written; raises for HTTP errors."""
+        if self.offset and response.status_code == 416:
+            return False  # The part file already holds the whole torrent
         response.raise_for_status()
+        if response.status_code != 206:
+            self.offset = 0  # Server ignored the Range header and sent everything
+        return True
 
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+    @contextmanager
+    def part_writer(self) -> Iterator[Callable[[bytes], None]]:
+        """A function writing body chunks to the part file; time between chunks counts as download time."""
+        read_time = write_time = 0.0
+        with open(self.part_path, 'ab' if self.offset else 'wb') as f:
+            read_start = time.perf_counter()
 
-        with open(filepath, 'wb') as f:
-            for data in response.iter_content(chunk_size=4096):
-                downloaded += len(data)
+            def write(data: bytes) -> None:
+                nonlocal read_start, read_time, write_time
+                write_start = time.perf_counter()
+                read_time += write_start - read_start
                 f.write(data)
-                if total_size != 0:
-                    progress = int(50 * downloaded / total_size)
-                    print(f"\rProgress: [{'=' * progress}{' ' * (50-progress)}] {downloaded}/{total_size} bytes", end='', flush=True)
+                progress.add_bytes(len(data))
+                read_start = time.perf_counter()
+                write_time += read_start - write_start
 
-        print(f"\nSaved to: {filepath}")
+            yield write
+        metrics.stage("download", read_time)
+        metrics.stage("disk_write", write_time)
+
+    def finish(self) -> bool:
+        path = store_torrent(self.store, self.part_path, self.expected_hash, self.safe_title, self.url)
+        logger.debug("Saved to: %s", path)
         return True
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error during download: {e}")
-        return False
+def download_failed(error: Exception, errors: Optional[List[Exception]] = None) -> bool:
+    """Logs why a download failed and adds the error to errors; always False, the result of a failed download."""
+    if errors is not None:
+        errors.append(error)
+    if isinstance(error, requests.exceptions.RequestException):
+        logger.error("Error during download: %s", error)
+    elif isinstance(error, ValueError):
+        logger.error("Downloaded torrent failed validation: %s", error)
+    else:
+        logger.error("A general error occurred during download: %s", error)
+    return False
+
+@metrics.timed
+def download_torrent(url: str, title: str, download_folder: Path, errors: Optional[List[Exception]] = None) -> bool:
+    """Downloads a torrent file.
+
+    Releases already in the info-hash index are linked under the title without any request.
+    Otherwise the transfer goes to a .part file that is resumed with a Range request after an
+    interruption, and is only stored once it decodes as a torrent with the expected info-hash.
+    The error a failed download ended with is added to errors.
+    """
+    try:
+        download = TorrentDownload(url, title, download_folder)
+        if download.stored():
+            return True
+
+        def attempt() -> None:
+            # Not fetch(): this whole attempt is what gets retried
+            with http_get(url, stream=True, timeout=30, headers=download.range_headers()) as response:  # Add timeout
+                if download.accept(response):
+                    with download.part_writer() as write:
+                        for data in response.iter_content(chunk_size=chunk_size):
+                            write(data)
+
+        # The whole transfer is retried, since a stream can also break after the headers
+        with download.claimed_part():
+            call_with_retries(attempt, url, request_retries)
+            return download.finish()
     except Exception as e:
-        print(f"A general error occurred during download: {e}")
-        return False
+        return download_failed(e, errors)
 
-def main():
-    current_dir = Path.cwd()
-    downloads_folder = current_dir / "movies"
-    downloads_folder.mkdir(exist_ok=True)
-    print(f"Files will be saved to: {downloads_folder}")
+@metrics.timed
+async def download_torrent_async(url: str, title: str, download_folder: Path,
+                                 errors: Optional[List[Exception]] = None) -> bool:
+    """download_torrent on the async engine."""
+    try:
+        download = TorrentDownload(url, title, download_folder)
+        if download.stored():
+            return True
 
-    base_browse_url = "https://yts.mx/browse-movies/0/all/animation/0/downloads/0/all"
-    all_movie_links = set()
-    page = 1
+        async def attempt() -> None:
+            async with async_client.stream(url, timeout=30, headers=download.range_headers()) as response:
+                if download.accept(response):
+                    with download.part_writer() as write:
+                        async for data in response.aiter_content(chunk_size):
+                            write(data)
 
-    while True:
-        browse_url = f"{base_browse_url}" if page == 1 else f"{base_browse_url}?page={page}" # Correct page construction
-        print(f"\nFetching movie links from: {browse_url}") # Print the constructed URL
-        movie_links = get_movie_links(browse_url)
+        with download.claimed_part():
+            await call_with_retries_async(attempt, url, request_retries)
+            return download.finish()
+    except Exception as e:
+        return download_failed(e, errors)
+
+class CrawlStats:
+    """Thread-safe counters shared by the pipeline stages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.movies = 0
+        self.downloaded = 0
+        self.exported = 0
+        self.skipped = 0
+        self.failed = 0
+        self.unchanged = 0  # Finished movies whose detail page a --probe run found unchanged
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current counters, for progress reports."""
+        with self._lock:
+            names = ("pages", "movies", "exported" if output_mode == "magnet" else "downloaded", "skipped", "failed")
+            if probe_mode:
+                names += ("unchanged",)
+            return {name: getattr(self, name) for name in names}
+
+def page_url(base_browse_url: str, page: int) -> str:
+    """URL of a listing page; works for browse pages and list_movies API URLs alike."""
+    if page == 1:
+        return base_browse_url
+    separator = "&" if "?" in base_browse_url else "?"
+    return f"{base_browse_url}{separator}page={page}"
+
+class ListingCursor:
+    """Pagination through one listing, shared by the threaded and the async producers.
+
+    Movies the frontier has seen in this run (e.g. in another genre's listing) are skipped. With stop_at_known,
+    pagination ends on the first page that contains a movie recorded by an earlier run, which is
+    only meaningful when the listing is sorted newest first. With the "api" engine the listing
+    already carries each movie's details, so the detail workers skip the fetch.
+    """
+
+    def __init__(self, base_browse_url: str, stats: CrawlStats, crawl_state: CrawlState,
+                 fresh: bool = False, stop_at_known: bool = False):
+        self.base_browse_url = base_browse_url
+        self.stats = stats
+        self.crawl_state = crawl_state
+        self.fresh = fresh
+        self.stop_at_known = stop_at_known
+        self.page = 1
+        self.failed_pages = 0
+        self.done = False
+
+    def next_url(self) -> str:
+        """The next page to fetch."""
+        while True:
+            browse_url = page_url(self.base_browse_url, self.page)
+            if self.fresh or not self.crawl_state.is_page_listed(browse_url):
+                logger.debug("Fetching movie links from: %s", browse_url)
+                return browse_url
+            self.page += 1  # Links from this page were recorded by an earlier run
+
+    def record(self, browse_url: str, movie_links: Optional[List[str]],
+               listing: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+        """Takes in the fetched page (None if the fetch failed) and returns the movie URLs to queue."""
+        page, crawl_state, stats = self.page, self.crawl_state, self.stats
+        if movie_links is None:
+            # Retries are exhausted; skip the page so one bad page does not end the whole crawl
+            crawl_state.mark_failed(browse_url, "listing fetch failed", kind=PAGE)
+            self.failed_pages += 1
+            if self.failed_pages >= MAX_FAILED_PAGES:
+                logger.error("%d listing pages in a row could not be fetched. Stopping.", self.failed_pages)
+                self.done = True
+            else:
+                logger.warning("Skipping page %d after repeated errors.", page)
+                self.page += 1
+            return []
+        self.failed_pages = 0
 
         if not movie_links:
-            print("No movie links found on this page or error occurred. Stopping.")
-            break
+            logger.info("No movie links found on page %d. Stopping.", page)
+            self.done = True
+            return []
 
-        new_links = set(movie_links) - all_movie_links
+        # Scoped to this listing: a page of links it already had means the listing is repeating
+        new_links = frontier.add(movie_links, scope=self.base_browse_url)
         if not new_links:
-            print("No *new* movie links found on this page. Stopping.")
-            break
-
-        all_movie_links.update(new_links)
-        print(f"Found {len(new_links)} *new* movies on page {page}.")
-
-        for movie_url in new_links:
-            print(f"\nProcessing movie: {movie_url}")
-            movie_details = get_movie_details(movie_url)
-            if movie_details:
-                title = movie_details["title"]
-                download_link = movie_details["download_link"]
-                if title and download_link:
-                    print(f"Title: {title}")
-                    success = download_torrent(download_link, title, downloads_folder)
-                    if success:
-                        print("Download completed successfully")
-                    else:
-                        print("Download failed")
+            logger.info("No *new* movie links found on page %d. Stopping.", page)
+            self.done = True
+            return []
+
+        new_links = frontier.add(new_links)  # Drops movies already queued from another genre's listing
+        unseen_links = crawl_state.discover(new_links)
+        known_links = len(new_links) - len(unseen_links)
+        if listing:
+            for movie_url in list(unseen_links):
+                details = listing[movie_url]
+                if exporter is not None:
+                    exporter.add(movie_url, details)
+                crawl_state.mark_details(movie_url, details["title"], details["download_link"])
+                if not details["download_link"]:
+                    crawl_state.mark_skipped(movie_url, "no torrent matches the selection spec")
+                    stats.add(skipped=1)
+                    unseen_links.remove(movie_url)
+        crawl_state.mark_page_listed(browse_url)
+        stats.add(pages=1)
+        logger.info("Found %d *new* movies on page %d (%d not seen before).",
+                    len(new_links), page, len(new_links) - known_links)
+        if probe_mode:
+            # Unfinished movies were queued by the resume step; finished ones are re-checked
+            unseen = set(unseen_links)
+            unseen_links += crawl_state.finished_movies(link for link in new_links if link not in unseen)
+
+        if self.stop_at_known and known_links:
+            logger.info("Reached movies recorded by an earlier run. Stopping.")
+            self.done = True
+        self.page += 1
+        return unseen_links
+
+def produce_movie_links(base_browse_urls: List[str], link_queue: queue.Queue, stats: CrawlStats,
+                        crawl_state: CrawlState, fresh: bool = False, stop_at_known: bool = False,
+                        engine: str = "html") -> None:
+    """Paginates each listing in turn and feeds movie URLs not seen in any run into the link queue.
+
+    Movies that appear under several genres are queued only once per run.
+    """
+    for base_browse_url in base_browse_urls:
+        cursor = ListingCursor(base_browse_url, stats, crawl_state, fresh, stop_at_known)
+        while not cursor.done:
+            browse_url = cursor.next_url()
+            movie_links, listing = fetch_listing(browse_url, engine)
+            for movie_url in cursor.record(browse_url, movie_links, listing):
+                link_queue.put(movie_url)  # Blocks while the detail workers are behind
+
+# (movie URL, title, download link, magnet link or None) handed from the detail to the download stage
+DownloadItem = Tuple[str, str, str, Optional[str]]
+
+def resumed_item(movie_url: str, crawl_state: CrawlState) -> Optional[DownloadItem]:
+    """The download item of a movie whose details were parsed by an earlier run, if there is one."""
+    record = crawl_state.get(movie_url)
+    if record and record["title"] and record["download_link"]:
+        return movie_url, record["title"], record["download_link"], None
+    return None
+
+def plan_movie(movie_url: str, stats: CrawlStats,
+               crawl_state: CrawlState) -> Tuple[Optional[DownloadItem], Optional[Dict[str, Any]]]:
+    """Where resolving a movie starts: the download item an earlier run parsed, or the validators to probe it with.
+
+    The validators are None unless --probe meets a movie an earlier run finished, and empty when
+    that run stored none; without them, probing would not save the fetch.
+    """
+    stats.add(movies=1)
+    if probe_mode and crawl_state.is_finished(movie_url):
+        return None, crawl_state.validators(movie_url) or {}
+    item = resumed_item(movie_url, crawl_state)
+    if item is None:
+        logger.debug("Processing movie: %s", movie_url)
+    return item, None
+
+def probed_unchanged(movie_url: str, stored: Dict[str, Any], current: Optional[Dict[str, Any]],
+                     stats: CrawlStats) -> bool:
+    """True, and counted, when a probe shows a finished movie's page is the one stored validators came from."""
+    if not unchanged(stored, current):
+        return False
+    logger.debug("Unchanged since the last run: %s", movie_url)
+    stats.add(unchanged=1)
+    return True
+
+def resolve_movie(movie_url: str, stats: CrawlStats, crawl_state: CrawlState) -> Optional[DownloadItem]:
+    """Fetches a movie's details; None means it was marked failed or skipped and has nothing to download.
+
+    With --probe, a movie an earlier run finished is only fetched again if a probe of its detail
+    page shows that the page changed.
+    """
+    item, stored = plan_movie(movie_url, stats, crawl_state)
+    if item is not None:
+        return item
+    if stored and probed_unchanged(movie_url, stored, probe_url(movie_url), stats):
+        return None
+    max_age = None if stored is None else 0  # A page that changed has a stale cached copy
+    errors: List[Exception] = []
+    with log_context(movie=movie_url):
+        movie_details = get_movie_details(movie_url, max_age, errors)
+    return record_details(movie_url, movie_details, stats, crawl_state, errors)
+
+async def resolve_movie_async(movie_url: str, stats: CrawlStats, crawl_state: CrawlState) -> Optional[DownloadItem]:
+    """resolve_movie on the async engine."""
+    item, stored = plan_movie(movie_url, stats, crawl_state)
+    if item is not None:
+        return item
+    if stored and probed_unchanged(movie_url, stored, await probe_url_async(movie_url), stats):
+        return None
+    max_age = None if stored is None else 0  # A page that changed has a stale cached copy
+    errors: List[Exception] = []
+    with log_context(movie=movie_url):
+        movie_details = await get_movie_details_async(movie_url, max_age, errors)
+    return record_details(movie_url, movie_details, stats, crawl_state, errors)
+
+def record_failure(movie_url: str, what: str, errors: Sequence[Exception], stats: CrawlStats,
+                   crawl_state: CrawlState) -> None:
+    """Marks a movie failed; a failure retry.py calls fatal, like a 404 page, dead-letters it at once."""
+    error = errors[-1] if errors else None
+    fatal = error is not None and is_fatal(error)
+    crawl_state.mark_failed(movie_url, f"{what}: {error}" if error else what, fatal=fatal)
+    if fatal:
+        logger.warning("Giving up on %s: %s", movie_url, error)
+    stats.add(failed=1)
+
+def record_details(movie_url: str, movie_details: Optional[Dict[str, Any]], stats: CrawlStats,
+                   crawl_state: CrawlState, errors: Sequence[Exception] = ()) -> Optional[DownloadItem]:
+    """Records fetched details (None if the fetch failed, errors saying why) and returns the download item."""
+    if not movie_details:
+        record_failure(movie_url, "details fetch failed", errors, stats, crawl_state)
+        return None
+    validators = movie_details.pop("validators", None)
+    if exporter is not None:
+        exporter.add(movie_url, movie_details)
+    title = movie_details["title"]
+    download_link = movie_details["download_link"]
+    crawl_state.mark_details(movie_url, title, download_link)
+    if validators:
+        crawl_state.set_validators(movie_url, validators)
+    if not download_link:
+        logger.info("No torrent matches the selection spec: %s", movie_url)
+        crawl_state.mark_skipped(movie_url, "no torrent matches the selection spec")
+        stats.add(skipped=1)
+        return None
+    logger.debug("Title: %s", title)
+    return movie_url, title, download_link, movie_details["magnet"]
+
+def detail_worker(link_queue: queue.Queue, download_queue: queue.Queue, stats: CrawlStats,
+                  crawl_state: CrawlState) -> None:
+    """Resolves queued movie URLs into download items for the download stage."""
+    while True:
+        wait_start = time.perf_counter()
+        movie_url = link_queue.get()
+        metrics.stage("detail_queue_wait", time.perf_counter() - wait_start)
+        if movie_url is _STOP:
+            return
+        item = resolve_movie(movie_url, stats, crawl_state)
+        if item is not None:
+            download_queue.put(item)
+
+def export_magnet(movie_url: str, title: str, download_link: str, magnet: Optional[str],
+                  stats: CrawlStats, crawl_state: CrawlState) -> None:
+    """Records a movie's magnet link in the crawl state without any network request."""
+    if magnet is None:
+        # Resumed from the crawl state, which keeps the download link but not the page's trackers
+        info_hash = expected_info_hash(download_link)
+        if info_hash is None:
+            logger.warning("No info-hash in %s; cannot build a magnet link for %s", download_link, title)
+            crawl_state.mark_skipped(movie_url, "no info-hash for a magnet link")
+            stats.add(skipped=1)
+            return
+        magnet = magnet_uri(info_hash, title)
+    crawl_state.mark_exported(movie_url, magnet)
+    stats.add(exported=1)
+
+def finish_movie(item: DownloadItem, downloads_folder: Path, stats: CrawlStats, crawl_state: CrawlState) -> bool:
+    """Downloads the item's torrent, or records its magnet link; returns False if the download failed."""
+    movie_url, title, download_link, magnet = item
+    if output_mode == "magnet":
+        export_magnet(movie_url, title, download_link, magnet, stats, crawl_state)
+        return True
+    errors: List[Exception] = []
+    with log_context(movie=movie_url):
+        downloaded = download_torrent(download_link, title, downloads_folder, errors)
+    return record_download(item, downloaded, stats, crawl_state, errors)
+
+async def finish_movie_async(item: DownloadItem, downloads_folder: Path, stats: CrawlStats,
+                             crawl_state: CrawlState) -> bool:
+    """finish_movie on the async engine."""
+    movie_url, title, download_link, magnet = item
+    if output_mode == "magnet":
+        export_magnet(movie_url, title, download_link, magnet, stats, crawl_state)
+        return True
+    errors: List[Exception] = []
+    with log_context(movie=movie_url):
+        downloaded = await download_torrent_async(download_link, title, downloads_folder, errors)
+    return record_download(item, downloaded, stats, crawl_state, errors)
+
+def record_download(item: DownloadItem, downloaded: bool, stats: CrawlStats, crawl_state: CrawlState,
+                    errors: Sequence[Exception] = ()) -> bool:
+    """Records how a torrent download went, with errors saying why it failed; returns downloaded."""
+    movie_url, title = item[:2]
+    if downloaded:
+        logger.debug("Download completed successfully: %s", title)
+        crawl_state.mark_downloaded(movie_url)
+        stats.add(downloaded=1)
+    else:
+        logger.warning("Download failed: %s", title)
+        record_failure(movie_url, "torrent download failed", errors, stats, crawl_state)
+    return downloaded
+
+def download_worker(download_queue: queue.Queue, downloads_folder: Path, stats: CrawlStats,
+                    crawl_state: CrawlState) -> None:
+    """Downloads the torrents queued by the detail workers, or records their magnet links."""
+    while True:
+        wait_start = time.perf_counter()
+        item = download_queue.get()
+        metrics.stage("download_queue_wait", time.perf_counter() - wait_start)
+        if item is _STOP:
+            return
+        finish_movie(item, downloads_folder, stats, crawl_state)
+
+def pending_movies(crawl_state: CrawlState) -> Iterator[str]:
+    """Movies an earlier run left unfinished, which both pipelines queue before paginating."""
+    pending = crawl_state.count_pending_movies()
+    if pending:
+        logger.info("Resuming %d unfinished movies from %s", pending, crawl_state.path)
+    return crawl_state.iter_pending_movies()
+
+def run_pipeline(base_browse_urls: List[str], downloads_folder: Path, crawl_state: CrawlState, detail_workers: int,
+                 download_workers: int, queue_size: int, fresh: bool = False,
+                 stop_at_known: bool = False, engine: str = "html") -> CrawlStats:
+    """Runs listing, detail and download stages concurrently, linked by bounded queues."""
+    link_queue = frontier.link_queue(queue_size)
+    download_queue = queue.Queue(maxsize=queue_size)
+    stats = CrawlStats()
+
+    detail_threads = [
+        threading.Thread(target=detail_worker, args=(link_queue, download_queue, stats, crawl_state),
+                         name=f"detail-{i}", daemon=True)
+        for i in range(detail_workers)
+    ]
+    download_threads = [
+        threading.Thread(target=download_worker, args=(download_queue, downloads_folder, stats, crawl_state),
+                         name=f"download-{i}", daemon=True)
+        for i in range(download_workers)
+    ]
+    for thread in detail_threads + download_threads:
+        thread.start()
+    progress.start(stats.snapshot)
+
+    for movie_url in pending_movies(crawl_state):
+        link_queue.put(movie_url)
+
+    # Pagination runs here and only waits when the link queue is full
+    produce_movie_links(base_browse_urls, link_queue, stats, crawl_state, fresh, stop_at_known, engine)
+
+    for _ in detail_threads:
+        link_queue.put(_STOP)
+    for thread in detail_threads:
+        thread.join()
+    for _ in download_threads:
+        download_queue.put(_STOP)
+    for thread in download_threads:
+        thread.join()
+    progress.stop()
+    return stats
+
+async def produce_movie_links_async(base_browse_urls: List[str], link_queue: asyncio.Queue, stats: CrawlStats,
+                                    crawl_state: CrawlState, fresh: bool = False, stop_at_known: bool = False,
+                                    engine: str = "html") -> None:
+    """produce_movie_links on the async engine."""
+    for base_browse_url in base_browse_urls:
+        cursor = ListingCursor(base_browse_url, stats, crawl_state, fresh, stop_at_known)
+        while not cursor.done:
+            browse_url = cursor.next_url()
+            movie_links, listing = await fetch_listing_async(browse_url, engine)
+            for movie_url in cursor.record(browse_url, movie_links, listing):
+                await link_queue.put(movie_url)
+
+async def detail_worker_async(link_queue: asyncio.Queue, download_queue: asyncio.Queue, stats: CrawlStats,
+                              crawl_state: CrawlState) -> None:
+    """detail_worker as an event loop task."""
+    while True:
+        wait_start = time.perf_counter()
+        movie_url = await link_queue.get()
+        metrics.stage("detail_queue_wait", time.perf_counter() - wait_start)
+        if movie_url is _STOP:
+            return
+        item = await resolve_movie_async(movie_url, stats, crawl_state)
+        if item is not None:
+            await download_queue.put(item)
+
+async def download_worker_async(download_queue: asyncio.Queue, downloads_folder: Path, stats: CrawlStats,
+                                crawl_state: CrawlState) -> None:
+    """download_worker as an event loop task."""
+    while True:
+        wait_start = time.perf_counter()
+        item = await download_queue.get()
+        metrics.stage("download_queue_wait", time.perf_counter() - wait_start)
+        if item is _STOP:
+            return
+        await finish_movie_async(item, downloads_folder, stats, crawl_state)
+
+async def run_pipeline_async(base_browse_urls: List[str], downloads_folder: Path, crawl_state: CrawlState,
+                             detail_workers: int, download_workers: int, queue_size: int, fresh: bool = False,
+                             stop_at_known: bool = False, engine: str = "html",
+                             host_concurrency: int = DEFAULT_HOST_CONCURRENCY) -> CrawlStats:
+    """run_pipeline on one event loop: every worker is a task, and all share one async HTTP client.
+
+    A worker costs a coroutine instead of a thread, so hundreds of requests can be in flight; the
+    per-host semaphores and the rate limiter decide how many actually reach each host at once.
+    """
+    global async_client
+    link_queue = frontier.async_link_queue(queue_size)
+    download_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = CrawlStats()
+
+    async with AsyncHttpClient(rate_limiter, metrics, route_url, host_concurrency,
+                               detail_workers + download_workers + 1,
+                               {"Accept-Encoding": _accept_encoding()}, mirrors.observe) as client:
+        async_client = client
+        logger.info("Async engine: HTTP/2 %s, at most %d requests in flight per host",
+                    "where the server offers it" if client.http2 else "off (needs the h2 package)",
+                    client.host_concurrency)
+        try:
+            detail_tasks = [
+                asyncio.create_task(detail_worker_async(link_queue, download_queue, stats, crawl_state),
+                                    name=f"detail-{i}")
+                for i in range(detail_workers)
+            ]
+            download_tasks = [
+                asyncio.create_task(download_worker_async(download_queue, downloads_folder, stats, crawl_state),
+                                    name=f"download-{i}")
+                for i in range(download_workers)
+            ]
+            progress.start(stats.snapshot)
+
+            for movie_url in pending_movies(crawl_state):
+                await link_queue.put(movie_url)
+
+            await produce_movie_links_async(base_browse_urls, link_queue, stats, crawl_state, fresh,
+                                            stop_at_known, engine)
+
+            for _ in detail_tasks:
+                await link_queue.put(_STOP)
+            await asyncio.gather(*detail_tasks)
+            for _ in download_tasks:
+                await download_queue.put(_STOP)
+            await asyncio.gather(*download_tasks)
+            progress.stop()
+        finally:
+            async_client = None
+    return stats
+
+def process_page_task(task: Task, work_queue, stats: CrawlStats, engine: str = "html") -> bool:
+    """Lists one page for the shared queue: its movies become tasks, and so does the next page."""
+    base_browse_url, page = task.payload["base"], task.payload["page"]
+    browse_url = page_url(base_browse_url, page)
+    movie_links, listing = fetch_listing(browse_url, engine)
+    if movie_links is None:
+        return False
+    stats.add(pages=1)
+    if not movie_links:
+        logger.info("No movie links found on page %d of %s. Stopping.", page, base_browse_url)
+        return True
+
+    added = 0
+    for movie_url in movie_links:
+        # The API listing already has the details, so the movie task needs no detail page
+        details = listing[movie_url] if listing else None
+        payload = {key: details[key] for key in ("title", "download_link", "magnet")} if details else None
+        if not work_queue.put(MOVIE_TASK, movie_url, payload):
+            continue  # Queued before, by this or another worker, and exported then
+        added += 1
+        if details is not None and exporter is not None:
+            exporter.add(movie_url, details)
+    logger.info("Queued %d new of %d movies on page %d.", added, len(movie_links), page)
+    # A page with nothing new repeats earlier pages and ends the listing, unless this is a retry
+    # of a page whose first attempt already queued its movies before its worker was lost
+    if added or task.attempts > 1:
+        work_queue.put(PAGE_TASK, page_url(base_browse_url, page + 1), {"base": base_browse_url, "page": page + 1})
+    return True
+
+def skip_page_task(task: Task, work_queue) -> None:
+    """Queues the page after one the queue gave up on, as the standalone pipeline skips a bad page.
+
+    The payload counts the pages in a row that could not be fetched; MAX_FAILED_PAGES of them end the listing.
+    """
+    base_browse_url, page = task.payload["base"], task.payload["page"]
+    failed_pages = task.payload.get("failed_pages", 0) + 1
+    if failed_pages >= MAX_FAILED_PAGES:
+        logger.error("%d listing pages in a row could not be fetched. Stopping.", failed_pages)
+        return
+    logger.warning("Skipping page %d after repeated errors.", page)
+    work_queue.put(PAGE_TASK, page_url(base_browse_url, page + 1),
+                   {"base": base_browse_url, "page": page + 1, "failed_pages": failed_pages})
+
+def process_movie_task(task: Task, downloads_folder: Path, stats: CrawlStats, crawl_state: CrawlState) -> bool:
+    """Fetches, selects and downloads one movie from the shared queue; False means try again later.
+
+    Only a FAILED movie is tried again: a dead-lettered one, like a 404 page, would fail the same way.
+    """
+    movie_url = task.key
+    crawl_state.discover([movie_url])  # The node's own state, for resumes and the output modes
+    if task.payload.get("title"):
+        stats.add(movies=1)
+        crawl_state.mark_details(movie_url, task.payload["title"], task.payload["download_link"])
+        if not task.payload["download_link"]:
+            crawl_state.mark_skipped(movie_url, "no torrent matches the selection spec")
+            stats.add(skipped=1)
+            return True
+        item = (movie_url, task.payload["title"], task.payload["download_link"], task.payload.get("magnet"))
+    else:
+        item = resolve_movie(movie_url, stats, crawl_state)
+    if item is not None:
+        finish_movie(item, downloads_folder, stats, crawl_state)
+    return crawl_state.get(movie_url)["state"] != FAILED
+
+def run_worker(work_queue, downloads_folder: Path, crawl_state: CrawlState, threads: int,
+               engine: str = "html", owner: Optional[str] = None) -> CrawlStats:
+    """Works on page and movie tasks from the shared queue until the crawl is finished.
+
+    Leases are renewed by a heartbeat while the process lives; if it is killed they run out and
+    the coordinator or another worker hands the tasks out again.
+    """
+    owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+    stats = CrawlStats()
+    stop = threading.Event()
+
+    def heartbeat() -> None:
+        while not stop.wait(work_queue.lease_seconds / 3):
+            work_queue.heartbeat(owner)
+
+    def work() -> None:
+        while True:
+            tasks = work_queue.lease(owner)
+            if not tasks:
+                if work_queue.drained():
+                    return
+                time.sleep(WORKER_IDLE_POLL)
+                continue
+            task = tasks[0]
+            try:
+                if task.kind == PAGE_TASK:
+                    done = process_page_task(task, work_queue, stats, engine)
                 else:
-                    print("Missing title or download link")
-            time.sleep(1)
-            print("-" * 80)
+                    done = process_movie_task(task, downloads_folder, stats, crawl_state)
+            except Exception as e:
+                logger.error("Task %s failed: %s", task.key, e)
+                done = False
+            if done:
+                recorded = work_queue.complete(task.key, owner)
+            else:
+                state = work_queue.fail(task.key, f"{task.kind} task failed", owner)
+                recorded = state is not None
+                if recorded:
+                    logger.warning("Task %s is now %s", task.key, state)
+                if state == FAILED and task.kind == PAGE_TASK:
+                    skip_page_task(task, work_queue)
+            if not recorded:
+                logger.warning("Lease of task %s ran out before it finished; its result is dropped", task.key)
+
+    logger.info("Worker %s taking tasks from %s with %d thread(s)", owner, work_queue.describe(), threads)
+    heartbeat_thread = threading.Thread(target=heartbeat, name="heartbeat", daemon=True)
+    heartbeat_thread.start()
+    workers = [threading.Thread(target=work, name=f"worker-{i}", daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    progress.start(stats.snapshot)
+    for thread in workers:
+        thread.join()
+    progress.stop()
+    stop.set()
+    heartbeat_thread.join()
+    return stats
+
+def run_coordinator(work_queue, base_browse_urls: List[str]) -> Dict[str, int]:
+    """Seeds the shared queue with the first listing pages and watches it until the crawl is done.
+
+    An unfinished crawl in the queue is resumed; a finished one is cleared and started over.
+    """
+    if work_queue.drained() or not work_queue.counts():
+        work_queue.reset()
+        for base_browse_url in base_browse_urls:
+            work_queue.put(PAGE_TASK, page_url(base_browse_url, 1), {"base": base_browse_url, "page": 1})
+        logger.info("Queued %d listing(s) in %s; start workers with --role worker", len(base_browse_urls),
+                    work_queue.describe())
+    else:
+        logger.info("Resuming the crawl in %s", work_queue.describe())
+    while not work_queue.drained():
+        time.sleep(COORDINATOR_POLL)
+        reclaimed = work_queue.reclaim_expired()
+        if reclaimed:
+            logger.warning("Reclaimed %d task(s) from workers that stopped sending heartbeats", reclaimed)
+        logger.info("Queue: %s", ", ".join(f"{count} {state}" for state, count in sorted(work_queue.counts().items())))
+    return work_queue.counts()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Download torrent files of movies from YTS "
+                                                 "(1080p animation unless a selection spec says otherwise).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"number of movie detail pages fetched in parallel (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--download-workers", type=int, default=None,
+                        help="number of torrents downloaded in parallel (default: same as --workers)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"movies buffered between pipeline stages (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--frontier", choices=FRONTIER_MODES, default="memory",
+                        help="where the run keeps seen and queued movie URLs: memory, or disk for catalog-sized "
+                             "crawls whose memory use must stay under --frontier-memory-mb (default: memory)")
+    parser.add_argument("--frontier-memory-mb", type=float, default=DEFAULT_FRONTIER_MB,
+                        help=f"memory cap of the disk frontier's Bloom filter and link queue (default: {DEFAULT_FRONTIER_MB:g})")
+    parser.add_argument("--spec", type=Path, default=None,
+                        help="JSON selection spec: genres, quality preference, codecs, rating, years, size cap "
+                             "(see selection.example.json)")
+    parser.add_argument("--state-db", type=Path, default=None,
+                        help="crawl state database used to resume interrupted runs (default: movies/crawl_state.sqlite3)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="re-read browse pages already listed by earlier runs (finished downloads are still skipped)")
+    parser.add_argument("--probe", action="store_true",
+                        help="re-read every browse page and re-check movies finished by earlier runs with a HEAD "
+                             "request; only detail pages whose ETag or length changed are fetched and parsed again")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"bytes written per read while downloading a torrent (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"retries for a request that failed with a transient error (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f"failed runs a URL may take part in before it goes to the dead-letter queue (default: {DEFAULT_MAX_ATTEMPTS})")
+    parser.add_argument("--drain-dead-letter", action="store_true",
+                        help="give URLs in the dead-letter queue a fresh attempt budget and retry them")
+    parser.add_argument("--new-only", action="store_true",
+                        help="browse newest first and stop at the first movie recorded by an earlier run (for daily refreshes)")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="HTTP response cache folder (default: movies/.http_cache)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help=f"seconds a cached detail page is used without revalidation (default: {DEFAULT_TTL})")
+    parser.add_argument("--cache-size-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help=f"maximum HTTP cache size before least recently used pages are evicted (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})")
+    parser.add_argument("--no-cache", action="store_true", help="disable the HTTP response cache")
+    parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"HTML parser backend; lxml and selectolax need their packages installed (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--rules", type=Path, default=None,
+                        help="JSON file of link selectors and patterns the parsers use (default: rules.json next to f1.py)")
+    parser.add_argument("--parse-processes", type=int, default=0,
+                        help="parse HTML in this many separate processes instead of the I/O threads (default: 0)")
+    parser.add_argument("--engine", choices=("html", "api"), default="html",
+                        help="discover movies from browse pages (html) or the list_movies JSON API, 50 movies per request (default: html)")
+    parser.add_argument("--api-url", default=yts_api.API_URL,
+                        help=f"list_movies endpoint used by --engine api (default: {yts_api.API_URL})")
+    parser.add_argument("--site-url", default=SITE_URL,
+                        help=f"send requests for {SITE_URL} pages and torrents to this base URL instead, "
+                             "e.g. the local replay server started by mock_server.py")
+    parser.add_argument("--mirrors", default=None,
+                        help="comma-separated base URLs of mirrors serving the same site; each request goes to the "
+                             "fastest healthy one (overrides --site-url)")
+    parser.add_argument("--probe-interval", type=float, default=DEFAULT_PROBE_INTERVAL,
+                        help=f"seconds between mirror health probes, 0 to only learn from crawl traffic "
+                             f"(default: {DEFAULT_PROBE_INTERVAL:g})")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run (default: off)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run the crawl on one asyncio event loop with the optional httpx package; "
+                             "--workers and --download-workers then count tasks, not threads")
+    parser.add_argument("--host-concurrency", type=int, default=DEFAULT_HOST_CONCURRENCY,
+                        help=f"most requests in flight to one host with --async (default: {DEFAULT_HOST_CONCURRENCY})")
+    parser.add_argument("--role", choices=("standalone", "coordinator", "worker"), default="standalone",
+                        help="standalone crawls alone; a coordinator hands listing pages and movies out to any "
+                             "number of worker processes through --queue (default: standalone)")
+    parser.add_argument("--queue", default=None,
+                        help="shared work queue: a SQLite file all nodes can reach, or a redis:// URL "
+                             "(default: movies/work_queue.sqlite3)")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                        help=f"seconds before a silent worker's tasks are handed to another worker (default: {DEFAULT_LEASE:g})")
+    parser.add_argument("--log-level", choices=LEVELS, default="INFO", type=str.upper,
+                        help="least severe messages shown; DEBUG lists every page, movie and file (default: INFO)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write log records as JSON lines with worker and movie fields")
+    parser.add_argument("--progress-interval", type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help=f"seconds between aggregated progress lines, 0 to disable (default: {DEFAULT_PROGRESS_INTERVAL:g})")
+    parser.add_argument("--max-rps", type=float, default=DEFAULT_MAX_RPS,
+                        help=f"maximum requests per second to a single host, 0 to disable (default: {DEFAULT_MAX_RPS})")
+    parser.add_argument("--output", choices=("torrent", "magnet"), default="torrent",
+                        help="download .torrent files, or only write magnet links without requesting any torrent (default: torrent)")
+    parser.add_argument("--magnet-file", type=Path, default=None,
+                        help="where --output magnet writes its links, one per line (default: movies/magnets.txt)")
+    parser.add_argument("--export", default="",
+                        help=f"comma-separated metadata export formats: {', '.join(EXPORT_FORMATS)} (parquet needs pyarrow)")
+    parser.add_argument("--export-dir", type=Path, default=None,
+                        help="folder for exported metadata files (default: movies/metadata)")
+    parser.add_argument("--export-batch", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"movies buffered before exported records are written (default: {DEFAULT_BATCH_SIZE})")
+    return parser.parse_args(argv)
 
-        page += 1
-        time.sleep(2)  # Delay between page requests
+def main(argv: Optional[List[str]] = None) -> Optional[CrawlStats]:
+    global http_cache, parser_backend, parse_pool, request_retries, chunk_size, selection, output_mode, exporter
+    global mirrors, frontier, probe_mode
+    args = parse_args(argv)
+    setup_logging(args.log_level, args.log_json)
+    progress.interval = args.progress_interval
+    if args.spec:
+        try:
+            selection = SelectionSpec.load(args.spec)
+        except (OSError, ValueError, TypeError) as e:
+            logger.error("Could not load selection spec %s: %s", args.spec, e)
+            return
+    if args.rules:
+        try:
+            use_rules(args.rules)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load extraction rules %s: %s", args.rules, e)
+            return
+    export_formats = [name.strip().lower() for name in args.export.split(",") if name.strip()]
+    try:
+        check_backend(args.parser)
+        check_formats(export_formats)
+        if args.use_async:
+            check_async()
+            if args.role != "standalone":
+                raise ValueError("--async only runs standalone crawls; coordinator and worker roles use threads")
+        if args.probe and (args.engine == "api" or args.role != "standalone"):
+            raise ValueError("--probe re-checks detail pages in standalone html crawls; the api engine never fetches them")
+    except ValueError as e:
+        logger.error("%s", e)
+        return
+    parser_backend = args.parser
+    request_retries = max(0, args.retries)
+    chunk_size = max(1024, args.chunk_size)
+    if args.parse_processes > 0:
+        # Parser processes load the same rules as this one
+        parse_pool = ProcessPoolExecutor(max_workers=args.parse_processes, initializer=use_rules if args.rules else None,
+                                         initargs=(args.rules,) if args.rules else ())
+        logger.info("Parsing HTML in %d process(es)", args.parse_processes)
+    rate_limiter.set_rate(args.max_rps)
+    output_mode = args.output
+    probe_mode = args.probe
+    try:
+        mirrors = MirrorPool((args.mirrors or args.site_url).split(","), SITE_URL)
+    except ValueError as e:
+        logger.error("%s", e)
+        return
+    workers = max(1, args.workers)
+    # Recording a magnet link is a local database write, one thread keeps up with any crawl
+    download_workers = 1 if output_mode == "magnet" else max(1, args.download_workers or workers)
+    configure_session(workers + download_workers + 1)  # +1 for the pagination thread
+
+    current_dir = Path.cwd()
+    downloads_folder = current_dir / "movies"
+    downloads_folder.mkdir(exist_ok=True)
+    logger.info("Files will be saved to: %s", downloads_folder)
+    logger.info("Using %d detail and %d download worker(s), at most %s requests/sec per host",
+                workers, download_workers, args.max_rps)
+
+    # Magnet runs keep their own state so switching modes does not count either output as done
+    default_state_db = "crawl_state.sqlite3" if output_mode == "torrent" else "crawl_state.magnet.sqlite3"
+    crawl_state = CrawlState(args.state_db or downloads_folder / default_state_db, max(1, args.max_attempts))
+    logger.info("Crawl state: %s", crawl_state.path)
+    if args.drain_dead_letter:
+        logger.info("Released %d URLs from the dead-letter queue", crawl_state.drain_dead_letters())
+    if not args.no_cache:
+        http_cache = HttpCache(args.cache_dir or downloads_folder / ".http_cache", args.cache_ttl,
+                               int(args.cache_size_mb * 1024 * 1024))
+        logger.info("HTTP cache: %s", http_cache.folder)
+    if export_formats:
+        exporter = MetadataExporter(args.export_dir or downloads_folder / "metadata", export_formats,
+                                    args.export_batch)
+        logger.info("Exporting movie metadata as %s to %s", ", ".join(export_formats), exporter.folder)
+    frontier = Frontier(args.frontier, downloads_folder / ".frontier", args.frontier_memory_mb)
+
+    order = "latest" if args.new_only else "downloads"
+    if args.new_only:
+        # Newest-first listing pages shift every day, so they are always re-read
+        logger.info("Incremental mode: stopping at the first movie seen in an earlier run")
+    if probe_mode:
+        logger.info("Probe mode: finished movies are fetched again only if their detail page changed")
+    fresh = args.fresh or args.new_only or probe_mode
+    if args.engine == "api":
+        base_browse_urls = [yts_api.list_movies_url(genre, order, args.api_url) for genre in selection.genres]
+    else:
+        base_browse_urls = [BROWSE_URL_TEMPLATE.format(genre=genre, order=order) for genre in selection.genres]
+    logger.info("Genres: %s; quality preference: %s", ", ".join(selection.genres), " > ".join(selection.qualities))
+    if len(mirrors.health) > 1:
+        logger.info("Mirrors: %s", ", ".join(mirror.base_url for mirror in mirrors.health))
+        mirrors.start_prober(lambda url, **kwargs: session.get(url, **kwargs), args.probe_interval)
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = start_metrics_server(metrics, args.metrics_port)
+        logger.info("Metrics: http://127.0.0.1:%d/metrics", args.metrics_port)
+    work_queue = None
+    try:
+        if args.role != "standalone":
+            try:
+                work_queue = open_work_queue(args.queue or str(downloads_folder / "work_queue.sqlite3"),
+                                             max(1.0, args.lease), max(1, args.max_attempts))
+            except ValueError as e:
+                logger.error("%s", e)
+                return
+            logger.info("Role: %s; work queue: %s", args.role, work_queue.describe())
+        if args.role == "coordinator":
+            stats = CrawlStats()
+            counts = run_coordinator(work_queue, base_browse_urls)
+            logger.info("All tasks finished: %s", ", ".join(f"{count} {state}" for state, count in sorted(counts.items())))
+        elif args.role == "worker":
+            stats = run_worker(work_queue, downloads_folder, crawl_state, workers, args.engine)
+        elif args.use_async:
+            stats = asyncio.run(run_pipeline_async(
+                base_browse_urls, downloads_folder, crawl_state, workers, download_workers, max(1, args.queue_size),
+                fresh, args.new_only, args.engine, max(1, args.host_concurrency)))
+        else:
+            stats = run_pipeline(base_browse_urls, downloads_folder, crawl_state, workers, download_workers,
+                                 max(1, args.queue_size), fresh, args.new_only, args.engine)
+        if output_mode == "magnet":
+            magnet_file = args.magnet_file or downloads_folder / "magnets.txt"
+            count = write_magnet_file(magnet_file, crawl_state.exported_magnets())
+            logger.info("Wrote %d magnet links to %s", count, magnet_file)
+        dead_letters = len(crawl_state.dead_letters())
+        if dead_letters:
+            logger.warning("%d URLs are in the dead-letter queue; run with --drain-dead-letter to retry them",
+                           dead_letters)
+    finally:
+        crawl_state.close()
+        if work_queue is not None:
+            work_queue.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+            parse_pool = None
+        if http_cache is not None:
+            logger.info("HTTP cache: %s", http_cache.summary())
+            http_cache.close()
+            http_cache = None
+        if exporter is not None:
+            exporter.close()
+            logger.info("Metadata: %s", exporter.summary())
+            exporter = None
+        logger.info("Frontier: %s", frontier.summary())
+        frontier.close()
+        mirrors.stop_prober()
+        if len(mirrors.health) > 1:
+            logger.info("Mirrors: %s", mirrors.summary())
 
-    print("\nFinished processing all pages.")
+    if rate_limiter.max_rate:
+        logger.info("Final request rates: %s", rate_limiter.summary())
+    done = f"{stats.exported} magnet links" if output_mode == "magnet" else f"{stats.downloaded} downloaded"
+    if probe_mode:
+        done += f", {stats.unchanged} unchanged"
+    logger.info("Processed %d movies from %d pages: %s, %d skipped, %d failed",
+                stats.movies, stats.pages, done, stats.skipped, stats.failed)
+    logger.info("Stage timings:\n%s", metrics.summary())
+    logger.info("Finished processing all pages.")
+    return stats
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
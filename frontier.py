@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+from collections import deque
+from math import exp
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+FRONTIER_MODES = ("memory", "disk")
+DEFAULT_MEMORY_MB = 64.0
+BLOOM_HASHES = 7  # About 1% false positives at 10 bits per key; a hit is confirmed on disk anyway
+_BYTES_PER_QUEUED_URL = 200  # Rough size of a queued URL string and its deque slot
+_KEY_MASK = (1 << 63) - 1  # SQLite integers are signed 64-bit
+
+def url_key(url: str, scope: str = "") -> int:
+    """A 63-bit ID for a URL's path within a scope; the host is ignored, so mirrors share IDs.
+
+    Sets of these IDs take a fraction of the memory of the URL strings. Collisions need about
+    three billion distinct paths before they become likely.
+    """
+    path = urlsplit(url).path.rstrip("/") or url
+    digest = hashlib.blake2b(f"{scope}\0{path}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & _KEY_MASK
+
+class BloomFilter:
+    """Fixed-size bit array answering "definitely new" or "maybe seen" for integer keys."""
+
+    def __init__(self, size_bytes: int, hashes: int = BLOOM_HASHES):
+        self.bits = bytearray(max(1, size_bytes))
+        self.size = len(self.bits) * 8
+        self.hashes = hashes
+        self.count = 0
+
+    def _positions(self, key: int) -> List[int]:
+        # Double hashing: k positions from the two halves of one 63-bit key
+        first, second = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key: int) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def false_positive_rate(self) -> float:
+        """Expected chance that a new key is reported as maybe seen, at the current fill."""
+        return (1 - exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+class MemorySeenSet:
+    """Seen URL IDs in a Python set: exact and fast, but it grows with the crawl."""
+
+    def __init__(self):
+        self._keys = set()
+
+    def add_new(self, keys: List[int]) -> List[bool]:
+        """Adds keys and tells, for each, whether it was new."""
+        new = []
+        for key in keys:
+            new.append(key not in self._keys)
+            self._keys.add(key)
+        return new
+
+    def close(self) -> None:
+        self._keys = set()
+
+    def describe(self) -> str:
+        return f"{len(self._keys)} IDs in memory"
+
+class DiskSeenSet:
+    """Seen URL IDs in SQLite with a Bloom filter in front, so memory use is fixed.
+
+    Keys the filter has never seen are new without a disk lookup; only its "maybe" answers are
+    checked against the table, so the set stays exact despite the filter's false positives.
+    """
+
+    def __init__(self, path: Path, bloom_bytes: int):
+        self.path = Path(path)
+        self.bloom = BloomFilter(bloom_bytes)
+        self.lookups = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")  # Rebuilt every run; durability buys nothing
+        self._conn.execute("DROP TABLE IF EXISTS seen")
+        self._conn.execute("CREATE TABLE seen (key INTEGER PRIMARY KEY) WITHOUT ROWID")
+
+    def add_new(self, keys: List[int]) -> List[bool]:
+        new = []
+        for key in keys:
+            if key in self.bloom:
+                self.lookups += 1
+                if self._conn.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone():
+                    new.append(False)
+                    continue
+            self._conn.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,))
+            self.bloom.add(key)
+            new.append(True)
+        self._conn.commit()
+        return new
+
+    def close(self) -> None:
+        self._conn.close()
+        self.path.unlink(missing_ok=True)
+
+    def describe(self) -> str:
+        return (f"{self.bloom.count} IDs on disk, {len(self.bloom.bits) // 1024} KB Bloom filter "
+                f"({self.bloom.false_positive_rate():.2%} false positives, {self.lookups} disk lookups)")
+
+class SpillBuffer:
+    """FIFO that holds at most memory_items items in memory and spills the rest to a file.
+
+    Items must be JSON-serializable. Once anything is spilled, newer items also go to the file
+    until it has been read back, so the order is always first in, first out.
+    """
+
+    def __init__(self, path: Path, memory_items: int):
+        self.path = Path(path)
+        self.memory_items = max(1, memory_items)
+        self.spilled = 0
+        self._memory: deque = deque()
+        self._on_disk = 0
+        self._writer = open(self.path, "wb")
+        self._reader = open(self.path, "rb")
+
+    def append(self, item: Any) -> None:
+        if self._on_disk or len(self._memory) >= self.memory_items:
+            self._writer.write(json.dumps(item).encode("utf-8") + b"\n")
+            self._writer.flush()
+            self._on_disk += 1
+            self.spilled += 1
+        else:
+            self._memory.append(item)
+
+    def popleft(self) -> Any:
+        if not self._memory and self._on_disk:
+            self._refill()
+        return self._memory.popleft()
+
+    def _refill(self) -> None:
+        while self._on_disk and len(self._memory) < self.memory_items:
+            self._memory.append(json.loads(self._reader.readline()))
+            self._on_disk -= 1
+        if not self._on_disk:  # Everything was read back; start the file over
+            self._writer.seek(0)
+            self._writer.truncate()
+            self._reader.seek(0)
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._on_disk
+
+    def close(self) -> None:
+        self._writer.close()
+        self._reader.close()
+        self.path.unlink(missing_ok=True)
+
+class SpillQueue(queue.Queue):
+    """An unbounded queue.Queue whose items beyond the memory share wait in a SpillBuffer."""
+
+    def __init__(self, buffer: SpillBuffer):
+        self.buffer = buffer
+        super().__init__()
+
+    def _init(self, maxsize: int) -> None:
+        self.queue = self.buffer
+
+class AsyncSpillQueue(asyncio.Queue):
+    """SpillQueue for the async engine."""
+
+    def __init__(self, buffer: SpillBuffer):
+        self.buffer = buffer
+        super().__init__()
+
+    def _init(self, maxsize: int) -> None:
+        self._queue = self.buffer
+
+class Frontier:
+    """The URLs a run has seen and the movie URLs waiting for a detail worker.
+
+    In "memory" mode URLs are remembered as 63-bit IDs in a set and the link queue is bounded,
+    so pagination waits for the detail workers. In "disk" mode memory_mb caps both: half goes
+    to a Bloom filter in front of an on-disk ID table, half to the link queue, which spills the
+    rest of the queued URLs to a file so pagination never has to wait.
+    """
+
+    def __init__(self, mode: str = "memory", folder: Optional[Path] = None, memory_mb: float = DEFAULT_MEMORY_MB):
+        if mode not in FRONTIER_MODES:
+            raise ValueError(f"Unknown frontier mode: {mode} (choose from {', '.join(FRONTIER_MODES)})")
+        self.mode = mode
+        self.folder = Path(folder) if folder is not None else None
+        self._lock = threading.Lock()
+        self._buffers: List[SpillBuffer] = []
+        budget = max(1024, int(memory_mb * 1024 * 1024))
+        if mode == "disk":
+            if self.folder is None:
+                raise ValueError("A disk frontier needs a folder")
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self.seen = DiskSeenSet(self.folder / "seen.sqlite3", budget // 2)
+            self.memory_items = max(1, budget // 2 // _BYTES_PER_QUEUED_URL)
+        else:
+            self.seen = MemorySeenSet()
+            self.memory_items = 0
+
+    def add(self, urls: Iterable[str], scope: str = "") -> List[str]:
+        """Records urls in scope and returns the ones not seen in it before, in their first order."""
+        urls = list(dict.fromkeys(urls))
+        with self._lock:
+            new = self.seen.add_new([url_key(url, scope) for url in urls])
+        return [url for url, is_new in zip(urls, new) if is_new]
+
+    def _buffer(self) -> SpillBuffer:
+        buffer = SpillBuffer(self.folder / f"queue-{len(self._buffers)}.jsonl", self.memory_items)
+        self._buffers.append(buffer)
+        return buffer
+
+    def link_queue(self, maxsize: int) -> queue.Queue:
+        """The queue between pagination and the detail workers."""
+        return SpillQueue(self._buffer()) if self.mode == "disk" else queue.Queue(maxsize=maxsize)
+
+    def async_link_queue(self, maxsize: int) -> asyncio.Queue:
+        return AsyncSpillQueue(self._buffer()) if self.mode == "disk" else asyncio.Queue(maxsize=maxsize)
+
+    def close(self) -> None:
+        for buffer in self._buffers:
+            buffer.close()
+        self._buffers = []
+        self.seen.close()
+
+    def summary(self) -> str:
+        spilled = sum(buffer.spilled for buffer in self._buffers)
+        return f"{self.mode} frontier: {self.seen.describe()}, {spilled} queued URLs spilled to disk"
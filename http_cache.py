@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTL = 24 * 60 * 60  # Seconds a cached page is served without asking the server
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Bodies are stored decoded, so these no longer describe them
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+class HttpCache:
+    """On-disk response cache keyed by URL, revalidated with ETag/Last-Modified and evicted LRU-first."""
+
+    def __init__(self, folder: Path, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.folder / "index.sqlite3"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup(self, url: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+        if row and not (self.folder / row["file"]).exists():
+            return None  # Body was removed behind our back, treat as a miss
+        return row
+
+    def _touch(self, url: str, revalidated: bool) -> None:
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._conn.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    def _to_response(self, row: sqlite3.Row) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = row["final_url"]
+        response.headers = CaseInsensitiveDict(json.loads(row["headers"]))
+        response._content = (self.folder / row["file"]).read_bytes()
+        return response
+
+    def _store(self, url: str, response: requests.Response) -> None:
+        filename = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        body = response.content
+        temp_path = self.folder / f"{filename}.tmp.{threading.get_ident()}"
+        temp_path.write_bytes(body)
+        os.replace(temp_path, self.folder / filename)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, file, final_url, headers, etag, last_modified, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, filename, response.url, json.dumps(headers), response.headers.get("ETag"),
+                 response.headers.get("Last-Modified"), len(body), now, now),
+            )
+            self._conn.commit()
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for row in self._conn.execute("SELECT url, file, size FROM entries ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (row["url"],))
+                try:
+                    (self.folder / row["file"]).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= row["size"]
+                self.stats["evictions"] += 1
+            self._conn.commit()
+
+    def _cached(self, url: str, max_age: Optional[float]) -> Tuple[Optional[sqlite3.Row], Optional[requests.Response]]:
+        """The entry for url, and its response when it is fresh enough to skip the server."""
+        ttl = self.ttl if max_age is None else max_age
+        row = self._lookup(url)
+        if row is not None and time.time() - row["stored_at"] < ttl:
+            self._touch(url, revalidated=False)
+            self._count("hits")
+            return row, self._to_response(row)
+        return row, None
+
+    def _conditional_headers(self, row: Optional[sqlite3.Row], headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        headers = dict(headers or {})
+        if row is not None:
+            if row["etag"]:
+                headers["If-None-Match"] = row["etag"]
+            if row["last_modified"]:
+                headers["If-Modified-Since"] = row["last_modified"]
+        return headers
+
+    def _update(self, url: str, row: Optional[sqlite3.Row], response: requests.Response) -> requests.Response:
+        """Stores a fresh response, or answers a 304 from the entry it revalidated."""
+        if row is not None and response.status_code == 304:
+            response.close()
+            self._touch(url, revalidated=True)
+            self._count("revalidated")
+            return self._to_response(row)
+        self._count("misses")
+        if response.status_code == 200:
+            self._store(url, response)
+        return response
+
+    def fetch(self, send: Callable[..., requests.Response], url: str, max_age: Optional[float] = None,
+              **kwargs) -> requests.Response:
+        """GETs url through send, answering from the cache or revalidating when possible.
+
+        max_age overrides the cache TTL for this request; 0 always revalidates with the server.
+        """
+        row, cached = self._cached(url, max_age)
+        if cached is not None:
+            return cached
+        headers = self._conditional_headers(row, kwargs.pop("headers", None))
+        return self._update(url, row, send(url, headers=headers, **kwargs))
+
+    async def fetch_async(self, send: Callable[..., Awaitable[requests.Response]], url: str,
+                          max_age: Optional[float] = None, **kwargs) -> requests.Response:
+        """fetch for a coroutine send, such as the async engine's client."""
+        row, cached = self._cached(url, max_age)
+        if cached is not None:
+            return cached
+        headers = self._conditional_headers(row, kwargs.pop("headers", None))
+        return self._update(url, row, await send(url, headers=headers, **kwargs))
+
+    def summary(self) -> str:
+        return ", ".join(f"{count} {name}" for name, count in self.stats.items())
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO
+
+LOGGER_NAME = "yts"
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_PROGRESS_INTERVAL = 1.0  # Seconds between aggregated progress lines
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Adds fields (e.g. the movie being processed) to every record logged by this thread or task."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Attaches the worker (asyncio task or thread) name and its log_context fields to each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # No event loop in this thread
+            task = None
+        record.worker = task.get_name() if task is not None else record.threadName
+        record.context = _context.get()
+        return True
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(worker)s] %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " (" + " ".join(f"{key}={value}" for key, value in context.items()) + ")"
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and jq."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "worker": getattr(record, "worker", record.threadName),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging(level: str = "INFO", json_output: bool = False, stream: Optional[TextIO] = None) -> logging.Logger:
+    """Configures the scraper's logger tree; calling it again replaces the earlier configuration."""
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+    handler.addFilter(ContextFilter())
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return logger
+
+def _format_bytes(count: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+class ProgressReporter:
+    """Aggregates progress from every worker into one log line per interval.
+
+    Workers only bump counters; a background thread does all the formatting and writing, so
+    reporting costs the download loop a lock and an addition per chunk instead of a flushed print.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = DEFAULT_PROGRESS_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts: Callable[[], Dict[str, int]] = dict
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self._bytes += count
+
+    def start(self, counts: Callable[[], Dict[str, int]]) -> None:
+        """Starts reporting; counts returns the crawl counters to show on each line."""
+        if self.interval <= 0:
+            return
+        self._counts = counts
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        last_line = None
+        last_bytes, last_time = self._bytes, time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            with self._lock:
+                total_bytes = self._bytes
+            line = ", ".join(f"{value} {name}" for name, value in self._counts().items())
+            line += f", {_format_bytes(total_bytes)} downloaded"
+            if line != last_line:  # Nothing is logged while the crawl is idle
+                rate = (total_bytes - last_bytes) / (now - last_time)
+                self.logger.info("Progress: %s (%s/s)", line, _format_bytes(rate))
+                last_line = line
+            last_bytes, last_time = total_bytes, now
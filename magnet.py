@@ -0,0 +1,43 @@
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qs, quote, urlparse
+
+# Trackers YTS lists in its own magnet links, used when a page or API response carries none
+DEFAULT_TRACKERS = [
+    "udp://open.demonii.com:1337/announce",
+    "udp://tracker.openbittorrent.com:80",
+    "udp://tracker.coppersurfer.tk:6969",
+    "udp://glotorrents.pw:6969/announce",
+    "udp://tracker.opentrackr.org:1337/announce",
+    "udp://torrent.gresille.org:80/announce",
+    "udp://p4p.arenabg.com:1337",
+    "udp://tracker.leechers-paradise.org:6969",
+]
+
+def trackers_from_magnet(uri: str) -> List[str]:
+    """The tr= trackers of an existing magnet link."""
+    return parse_qs(urlparse(uri).query).get("tr", [])
+
+def magnet_uri(info_hash: str, name: str, trackers: Optional[List[str]] = None) -> str:
+    """Builds a magnet link for a torrent from its info-hash."""
+    params = [f"xt=urn:btih:{info_hash.upper()}", f"dn={quote(name)}"]
+    params += [f"tr={quote(tracker, safe='')}" for tracker in (trackers or DEFAULT_TRACKERS)]
+    return "magnet:?" + "&".join(params)
+
+def write_magnet_file(path: Path, uris: Iterable[str]) -> int:
+    """Writes one magnet link per line in a single pass; returns the count.
+
+    uris is consumed as it is written and is expected to hold each hash once, as
+    CrawlState.exported_magnets does. The file is written next to its destination and swapped
+    in, so readers never see half of it.
+    """
+    path = Path(path)
+    count = 0
+    part = path.with_name(path.name + ".part")
+    with open(part, "w", encoding="utf-8") as f:
+        for uri in uris:
+            f.write(uri + "\n")
+            count += 1
+    os.replace(part, path)
+    return count
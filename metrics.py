@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+
+# Upper bounds in seconds, from sub-millisecond parses to minute-long stalled transfers
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Pipeline stages, in the order a movie meets them. Queue waits are idle worker time: a stage
+# whose workers wait long is starved by the stage before it.
+STAGES = ("detail_queue_wait", "download_queue_wait", "rate_limit_wait", "ttfb", "download", "parse", "disk_write")
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum, as in a Prometheus histogram."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is the +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+class Metrics:
+    """Thread-safe histograms of stage and call durations, keyed by (metric, label value)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, metric: str, label: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get((metric, label))
+            if histogram is None:
+                histogram = self._histograms[(metric, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def stage(self, name: str, seconds: float) -> None:
+        """Records time spent in one pipeline stage (see STAGES)."""
+        self.observe("stage", name, seconds)
+
+    def count(self, metric: str, label: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[(metric, label)] = self._counters.get((metric, label), 0) + value
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(stage, time.perf_counter() - start)
+
+    def timed(self, func):
+        """Decorator recording every call's duration under the function's name, failures included.
+
+        Coroutine functions are timed from the first step to the result, awaits included.
+        """
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe("call", func.__name__, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe("call", func.__name__, time.perf_counter() - start)
+        return wrapper
+
+    def snapshot(self, metric: str) -> Dict[str, Histogram]:
+        with self._lock:
+            return {label: histogram for (name, label), histogram in self._histograms.items() if name == metric}
+
+    def render(self) -> str:
+        """The Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        families = {"stage": ("yts_stage_seconds", "stage", "Time spent in each pipeline stage"),
+                    "call": ("yts_call_seconds", "function", "Duration of scraper calls")}
+        declared = set()
+        for (metric, label), histogram in histograms:
+            name, label_name, help_text = families.get(metric, (f"yts_{metric}_seconds", "label", metric))
+            if name not in declared:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram.count}')
+        counter_labels = {"responses": "status"}
+        for (metric, label), value in counters:
+            name = f"yts_{metric}_total"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f'{name}{{{counter_labels.get(metric, "label")}="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """A table of every stage and call: count, total time, mean, p50 and p99."""
+        lines = [f"{'':<22} {'count':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}"]
+        stages = self.snapshot("stage")
+        ordered = [(name, stages[name]) for name in STAGES if name in stages]
+        ordered += sorted(self.snapshot("call").items())
+        for name, histogram in ordered:
+            lines.append(f"{name:<22} {histogram.count:>7} {histogram.sum:>9.2f} "
+                         f"{histogram.sum / histogram.count * 1000:>9.1f} {histogram.quantile(0.5) * 1000:>9.1f} "
+                         f"{histogram.quantile(0.99) * 1000:>9.1f}")
+        return "\n".join(lines)
+
+def start_http_server(metrics: Metrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves metrics.render() at /metrics on a background thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            found = self.path.split("?")[0] == "/metrics"
+            body = metrics.render().encode() if found else b"Not found"
+            self.send_response(200 if found else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
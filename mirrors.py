@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+DEFAULT_PROBE_INTERVAL = 30.0  # Seconds between health probes of every mirror
+PROBE_PATH = "/robots.txt"  # Small and cheap for the site; any non-5xx answer counts as healthy
+EWMA_ALPHA = 0.3  # Weight of the newest sample in the rolling latency and error rates
+ERROR_WEIGHT = 10.0  # A mirror failing every request scores as 11 times its latency
+MAX_CONSECUTIVE_ERRORS = 3  # Failures in a row that take a mirror out of rotation
+COOLDOWN = 30.0  # Seconds an unhealthy mirror is skipped before requests try it again
+REDIRECT_TTL = 300.0  # Seconds a temporary redirect is remembered; permanent ones are kept
+MAX_REDIRECTS = 4096  # Per-URL redirect targets kept, least recently used dropped first
+PERMANENT_REDIRECTS = (301, 308)
+
+def origin(url: str) -> str:
+    """scheme://host[:port] of url, lower-cased and without a default port."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    default_port = {"http": 80, "https": 443}.get(parts.scheme.lower())
+    if parts.port and parts.port != default_port:
+        host = f"{host}:{parts.port}"
+    return f"{parts.scheme.lower()}://{host}"
+
+def path_of(url: str) -> str:
+    """The path and query of url, the part that stays the same across mirrors."""
+    parts = urlsplit(url)
+    return urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+def is_failure(status: Optional[int]) -> bool:
+    """True for answers that say the mirror, not the page, is in trouble."""
+    return status is None or status == 429 or status >= 500
+
+@dataclass
+class MirrorHealth:
+    """Rolling latency and error stats of one mirror."""
+    base_url: str
+    latency: Optional[float] = None  # EWMA of seconds to the response headers; None until measured
+    error_rate: float = 0.0  # EWMA of failed requests, 0 to 1
+    consecutive_errors: int = 0
+    down_until: float = 0.0  # Monotonic time before which the mirror is skipped
+    requests: int = 0
+    errors: int = 0
+
+    def record(self, elapsed: float, failed: bool, now: float) -> None:
+        self.requests += 1
+        self.error_rate += EWMA_ALPHA * (float(failed) - self.error_rate)
+        if failed:
+            self.errors += 1
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                self.down_until = now + COOLDOWN
+            return
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+        self.latency = elapsed if self.latency is None else self.latency + EWMA_ALPHA * (elapsed - self.latency)
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def score(self) -> float:
+        """Lower is better: the latency, inflated by the recent error rate."""
+        return (self.latency or 0.0) * (1 + ERROR_WEIGHT * self.error_rate)
+
+class MirrorPool:
+    """Mirror domains of the site, with every request routed to the fastest healthy one.
+
+    URLs are recorded everywhere in their canonical form, so the crawl state, the HTTP cache and
+    the frontier deduplicate across mirrors; route() rewrites them just before they are sent,
+    and observe() feeds each answer back into the mirror's rolling stats. Redirects are cached:
+    a mirror that redirects to the same path on another domain is aliased to that domain, and
+    other redirects are remembered per URL, so later requests skip the extra round trip.
+    """
+
+    def __init__(self, mirrors: Sequence[str], canonical: Optional[str] = None):
+        bases = list(dict.fromkeys(origin(mirror) for mirror in mirrors if mirror.strip()))
+        if not bases:
+            raise ValueError("At least one mirror is needed")
+        self.canonical = origin(canonical) if canonical else bases[0]
+        self.health = [MirrorHealth(base) for base in bases]
+        self._lock = threading.Lock()
+        self._aliases: Dict[str, str] = {}  # Origin -> origin it redirects to with the path unchanged
+        self._redirects: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # URL -> (target, expires)
+        self._known = {self.canonical, *bases}
+        self._prober: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def is_site(self, url: str) -> bool:
+        """True for absolute URLs on the canonical domain, a mirror or a domain one redirected to."""
+        return origin(url) in self._known
+
+    def normalize(self, url: str) -> str:
+        """The canonical form of a site URL: relative and mirror URLs are moved to the canonical
+        domain and fragments dropped. Other URLs only lose their fragment."""
+        absolute = urljoin(self.canonical + "/", url)
+        if origin(absolute) in self._known:
+            return self.canonical + path_of(absolute)
+        return urlunsplit(urlsplit(absolute)._replace(fragment=""))
+
+    def site_links(self, urls: Iterable[str]) -> List[str]:
+        """The site URLs among urls, normalized, each once, in their first order."""
+        links = (self.normalize(url) for url in urls)
+        return list(dict.fromkeys(link for link in links if link.startswith(self.canonical + "/")))
+
+    def _best(self, now: float) -> MirrorHealth:
+        healthy = [mirror for mirror in self.health if mirror.healthy(now)]
+        if not healthy:  # Everything is down: try the one that comes back first
+            return min(self.health, key=lambda mirror: mirror.down_until)
+        # Unmeasured mirrors wait for the prober, unless nothing has been measured yet
+        return min(healthy, key=lambda mirror: (mirror.latency is None, mirror.score()))
+
+    def route(self, url: str) -> str:
+        """Where a request for url goes: the best mirror, following cached redirects."""
+        if not self.is_site(url):
+            return url
+        now = time.monotonic()
+        with self._lock:
+            routed = self._best(now).base_url + path_of(url)
+            seen = set()
+            while True:
+                alias = self._aliases.get(origin(routed))
+                if alias and alias not in seen:
+                    seen.add(alias)
+                    routed = alias + path_of(routed)
+                    continue
+                cached = self._redirects.get(routed)
+                if cached and cached[1] > now and cached[0] not in seen:
+                    self._redirects.move_to_end(routed)
+                    seen.add(cached[0])
+                    routed = cached[0]
+                    continue
+                return routed
+
+    def _mirror_for(self, url: str) -> Optional[MirrorHealth]:
+        base = origin(url)
+        sources = {base, *(source for source, target in self._aliases.items() if target == base)}
+        return next((mirror for mirror in self.health if mirror.base_url in sources), None)
+
+    def observe(self, url: str, status: Optional[int], elapsed: float, final_url: Optional[str] = None,
+                redirects: Sequence[int] = ()) -> None:
+        """Records the answer to a routed request: its status (None when it failed outright), the
+        seconds to its headers, and the URL and redirect statuses it ended at."""
+        now = time.monotonic()
+        with self._lock:
+            mirror = self._mirror_for(url)
+            if mirror is not None:
+                mirror.record(elapsed, is_failure(status), now)
+            if not final_url or final_url == url or not redirects or is_failure(status):
+                return
+            expires = float("inf") if all(code in PERMANENT_REDIRECTS for code in redirects) else now + REDIRECT_TTL
+            source, target = origin(url), origin(final_url)
+            if expires == float("inf") and source != target and path_of(url) == path_of(final_url):
+                self._aliases[source] = target  # The whole domain moved
+                self._known.add(target)
+                return
+            self._redirects[url] = (final_url, expires)
+            self._redirects.move_to_end(url)
+            while len(self._redirects) > MAX_REDIRECTS:
+                self._redirects.popitem(last=False)
+
+    def probe(self, get: Callable[..., object], timeout: float = 10.0) -> None:
+        """GETs PROBE_PATH on every mirror with a requests-style get and records the results, so
+        idle mirrors stay measured and a mirror that came back is used again."""
+        for mirror in list(self.health):
+            url = mirror.base_url + PROBE_PATH
+            start = time.monotonic()
+            try:
+                response = get(url, timeout=timeout)
+            except Exception:
+                self.observe(url, None, time.monotonic() - start)
+                continue
+            response.close()
+            self.observe(url, response.status_code, response.elapsed.total_seconds(), response.url,
+                         [redirect.status_code for redirect in response.history])
+
+    def start_prober(self, get: Callable[..., object], interval: float = DEFAULT_PROBE_INTERVAL) -> None:
+        """Probes the mirrors now and then every interval seconds on a daemon thread."""
+        if self._prober is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while True:
+                self.probe(get)
+                if self._stop.wait(interval):
+                    return
+
+        self._prober = threading.Thread(target=run, name="mirror-prober", daemon=True)
+        self._prober.start()
+
+    def stop_prober(self) -> None:
+        self._stop.set()
+        if self._prober is not None:
+            self._prober.join(timeout=1.0)
+            self._prober = None
+
+    def summary(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            parts = []
+            for mirror in self.health:
+                latency = "unmeasured" if mirror.latency is None else f"{mirror.latency * 1000:.0f} ms"
+                state = "" if mirror.healthy(now) else ", down"
+                parts.append(f"{mirror.base_url} {latency}, {mirror.errors}/{mirror.requests} errors{state}")
+            aliases = "".join(f"; {source} -> {target}" for source, target in self._aliases.items())
+            return "; ".join(parts) + aliases + f"; {len(self._redirects)} cached redirects"
@@ -0,0 +1,278 @@
+"""Local stand-in for yts.mx, so the scraper can be exercised and benchmarked offline.
+
+It serves the list_movies API, browse and detail pages replayed from the recorded pages in
+fixtures/, and real .torrent files, with optional latency and injected errors.
+
+Usage:
+    python mock_server.py --port 8000 --pages 6 --latency 50 --error-rate 0.02
+    python f1.py --engine api --api-url http://127.0.0.1:8000/api/v2/list_movies.json
+    python f1.py --site-url http://127.0.0.1:8000
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import bencode
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+BROWSE_PAGE_SIZE = 20  # Movies per browse page, as on the recorded page
+# Recorded detail pages used as templates: file, slug and the title shown in its h1 (if any)
+DETAIL_TEMPLATES = [("up-2009.html", "up-2009", "Up"), ("toy-story-1995.html", "toy-story-1995", None)]
+HASH_RE = re.compile(r"[0-9A-F]{40}")
+
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Family", "Fantasy"]
+QUALITIES = [("720p", "bluray", "x264", 800), ("1080p", "bluray", "x264", 1600), ("2160p", "web", "x265", 4800)]
+TRACKER = "udp://tracker.opentrackr.org:1337/announce"
+
+def build_torrent(name: str, size_bytes: int) -> bytes:
+    """A small but well-formed .torrent file for a single-file release."""
+    piece_length = 4 * 1024 * 1024
+    pieces = -(-size_bytes // piece_length)
+    info = {
+        "name": f"{name}.mp4",
+        "length": size_bytes,
+        "piece length": piece_length,
+        "pieces": b"".join(hashlib.sha1(f"{name}:{i}".encode()).digest() for i in range(pieces)),
+    }
+    return bencode.encode({"announce": TRACKER, "created by": "mock_server", "info": info})
+
+def build_catalog(count: int, torrents_by_hash: Dict[str, bytes]) -> List[Dict[str, Any]]:
+    """Deterministic catalog of animation movies shaped like list_movies API objects.
+
+    The generated .torrent files are added to torrents_by_hash under their real info-hash.
+    """
+    movies = []
+    for index in range(1, count + 1):
+        year = 1990 + index % 34
+        slug = f"mock-movie-{index:04d}-{year}"
+        torrents = []
+        for quality, source, codec, size_mb in QUALITIES[: 2 + index % 2]:
+            torrent = build_torrent(f"{slug}-{quality}", size_mb * 1024 * 1024)
+            torrent_hash = bencode.info_hash(torrent)
+            torrents_by_hash[torrent_hash] = torrent
+            torrents.append({
+                "url": f"/torrent/download/{torrent_hash}",
+                "hash": torrent_hash,
+                "quality": quality,
+                "type": source,
+                "video_codec": codec,
+                "seeds": (index * 7) % 300,
+                "peers": (index * 3) % 90,
+                "size": f"{size_mb / 1000:.2f} GB",
+                "size_bytes": size_mb * 1024 * 1024,
+                "date_uploaded_unix": 1500000000 + index * 86400,
+            })
+        movies.append({
+            "id": index,
+            "url": f"https://yts.mx/movies/{slug}",
+            "slug": slug,
+            "title": f"Mock Movie {index:04d}",
+            "title_long": f"Mock Movie {index:04d} ({year})",
+            "year": year,
+            "rating": round(5 + (index % 50) / 10, 1),
+            "runtime": 80 + index % 60,
+            "genres": ["Animation", GENRES[index % len(GENRES)]],
+            "download_count": (count - index + 1) * 1000,
+            "date_uploaded_unix": 1500000000 + index * 86400,
+            "torrents": torrents,
+        })
+    return movies
+
+class ReplaySite:
+    """Browse and detail pages for a catalog, rendered from the recorded pages in fixtures/.
+
+    Each movie's detail page is a recorded page with the slug, title and info-hashes swapped for
+    the movie's own, and a real torrent is generated for every swapped hash, so downloads verify.
+    """
+
+    def __init__(self, catalog: List[Dict[str, Any]], torrents_by_hash: Dict[str, bytes]):
+        browse = (FIXTURES / "browse.html").read_text(encoding="utf-8")
+        first = browse.index('<div class="browse-movie-wrap')
+        end = browse.index("</div></section>", first)
+        cards = browse[first:end].split('<div class="browse-movie-wrap')
+        self.browse_head, self.browse_tail = browse[:first], browse[end:]
+        self.card = '<div class="browse-movie-wrap' + cards[1]
+        self.card_slug = re.search(r"/movies/([^\"]+)\"", self.card).group(1)
+        self.card_title = re.search(r'class="browse-movie-title">([^<]+)<', self.card).group(1)
+        templates = [((FIXTURES / name).read_text(encoding="utf-8"), slug, title)
+                     for name, slug, title in DETAIL_TEMPLATES]
+        self.details = {movie["slug"]: self._detail_page(templates[index % len(templates)], movie, torrents_by_hash)
+                        for index, movie in enumerate(catalog)}
+
+    def _detail_page(self, template: Tuple[str, str, Optional[str]], movie: Dict[str, Any],
+                     torrents_by_hash: Dict[str, bytes]) -> bytes:
+        page, slug, title = template
+        page = page.replace(slug, movie["slug"]).replace(f"<h2>{slug[-4:]}</h2>", f"<h2>{movie['year']}</h2>")
+        if title:
+            page = page.replace(f'class="title">{title}<', f'class="title">{movie["title"]}<')
+        hashes = {}
+        for old_hash in dict.fromkeys(HASH_RE.findall(page)):
+            torrent = build_torrent(f"{movie['slug']}-{old_hash[:8]}", 700 * 1024 * 1024)
+            hashes[old_hash] = bencode.info_hash(torrent)
+            torrents_by_hash[hashes[old_hash]] = torrent
+        return HASH_RE.sub(lambda match: hashes[match.group(0)], page).encode("utf-8")
+
+    def browse_page(self, movies: List[Dict[str, Any]]) -> bytes:
+        cards = "".join(self.card.replace(self.card_slug, movie["slug"])
+                        .replace(f">{self.card_title}<", f">{movie['title']}<") for movie in movies)
+        return (self.browse_head + cards + self.browse_tail).encode("utf-8")
+
+class MockYTSHandler(BaseHTTPRequestHandler):
+    catalog: List[Dict[str, Any]] = []
+    torrents: Dict[str, bytes] = {}
+    site: Optional[ReplaySite] = None
+    latency = 0.0  # Seconds added before every response
+    jitter = 0.0  # Up to this many extra seconds, drawn per request
+    error_rate = 0.0  # Share of requests answered with 503 instead
+    redirect_to = ""  # Base URL every request is permanently redirected to, like a retired mirror domain
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark and test output quiet
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None) -> None:
+        """Sends a response; 200s carry an ETag and become 304s when the client already has that version."""
+        headers = dict(headers or {})
+        if status == 200:
+            headers["ETag"] = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()  # Same status and headers; _send leaves out the body
+
+    def send_torrent(self, torrent: bytes) -> None:
+        """Serves a torrent, honouring open-ended Range requests like a real file server."""
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if not match:
+            self._send(200, torrent, "application/x-bittorrent", {"Accept-Ranges": "bytes"})
+            return
+        start = int(match.group(1))
+        if start >= len(torrent):
+            self._send(416, b"", "application/x-bittorrent", {"Content-Range": f"bytes */{len(torrent)}"})
+            return
+        self._send(206, torrent[start:], "application/x-bittorrent",
+                   {"Content-Range": f"bytes {start}-{len(torrent) - 1}/{len(torrent)}"})
+
+    def do_GET(self):
+        with self.rng_lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            failed = self.rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self._send(503, b"Service temporarily unavailable", "text/plain")
+            return
+        if self.redirect_to:
+            self._send(301, b"", "text/plain", {"Location": self.redirect_to + self.path})
+            return
+        parsed = urlparse(self.path)
+        browse = re.fullmatch(r"/browse-movies/[^/]+/[^/]+/([^/]+)/[^/]+/([^/]+)/[^/]+/[^/]+", parsed.path)
+        if browse and self.site:
+            page = max(int(parse_qs(parsed.query).get("page", ["1"])[0]), 1)
+            self._send(200, self.site.browse_page(self.browse_movies(browse.group(1), browse.group(2), page)),
+                       "text/html; charset=utf-8")
+        elif parsed.path.startswith("/movies/") and self.site:
+            page = self.site.details.get(parsed.path[len("/movies/"):].strip("/"))
+            if page is None:
+                self._send(404, b"Not found", "text/plain")
+            else:
+                self._send(200, page, "text/html; charset=utf-8")
+        elif parsed.path == "/api/v2/list_movies.json":
+            self._send(200, json.dumps(self.list_movies(parse_qs(parsed.query))).encode(), "application/json")
+        elif parsed.path.startswith("/torrent/download/"):
+            torrent = self.torrents.get(parsed.path.rsplit("/", 1)[-1].upper())
+            if torrent is None:
+                self._send(404, b"Not found", "text/plain")
+            else:
+                self.send_torrent(torrent)
+        else:
+            self._send(404, b"Not found", "text/plain")
+
+    def sorted_movies(self, genre: str, key: str, descending: bool = True) -> List[Dict[str, Any]]:
+        movies = [movie for movie in self.catalog
+                  if genre == "all" or genre in (g.lower() for g in movie["genres"])]
+        movies.sort(key=lambda movie: movie[key], reverse=descending)
+        return movies
+
+    def browse_movies(self, genre: str, order: str, page: int) -> List[Dict[str, Any]]:
+        """The movies on one browse page; pages past the end are empty, as on the real site."""
+        movies = self.sorted_movies(genre.lower(), "date_uploaded_unix" if order == "latest" else "download_count")
+        return movies[(page - 1) * BROWSE_PAGE_SIZE: page * BROWSE_PAGE_SIZE]
+
+    def list_movies(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        genre = query.get("genre", ["all"])[0].lower()
+        sort_by = query.get("sort_by", ["date_added"])[0]
+        limit = min(max(int(query.get("limit", ["20"])[0]), 1), 50)
+        page = max(int(query.get("page", ["1"])[0]), 1)
+
+        key = "download_count" if sort_by == "download_count" else "date_uploaded_unix"
+        movies = self.sorted_movies(genre, key, query.get("order_by", ["desc"])[0] == "desc")
+
+        host = f"http://{self.headers.get('Host')}"
+        page_movies = []
+        for movie in movies[(page - 1) * limit: page * limit]:
+            movie = dict(movie, torrents=[dict(t, url=host + t["url"]) for t in movie["torrents"]])
+            page_movies.append(movie)
+        data = {"movie_count": len(movies), "limit": limit, "page_number": page}
+        if page_movies:
+            data["movies"] = page_movies
+        return {"status": "ok", "status_message": "Query was successful", "data": data}
+
+def start_server(port: int = 0, movies: int = 120, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0, redirect_to: str = "") -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the mock server on a background thread and returns it with its base URL."""
+    torrents: Dict[str, bytes] = {}
+    catalog = build_catalog(movies, torrents)
+    handler = type("Handler", (MockYTSHandler,), {
+        "catalog": catalog, "torrents": torrents, "site": ReplaySite(catalog, torrents),
+        "latency": latency, "jitter": jitter, "error_rate": error_rate, "redirect_to": redirect_to.rstrip("/"),
+        "rng": random.Random(seed), "rng_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="mock-yts", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock YTS site and list_movies API.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--movies", type=int, default=120, help="number of movies in the catalog (default: 120)")
+    parser.add_argument("--pages", type=int, default=None,
+                        help=f"size the catalog to this many browse pages of {BROWSE_PAGE_SIZE} movies (overrides --movies)")
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds added to every response (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many random extra milliseconds (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for jitter and injected errors (default: 0)")
+    parser.add_argument("--redirect-to", default="",
+                        help="answer every request with a 301 to the same path on this base URL, like a moved mirror")
+    args = parser.parse_args()
+    movies = args.pages * BROWSE_PAGE_SIZE if args.pages else args.movies
+    server, base_url = start_server(args.port, movies, args.latency / 1000, args.jitter / 1000,
+                                    args.error_rate, args.seed, args.redirect_to)
+    print(f"Mock YTS site at {base_url} with {movies} movies, API at {base_url}/api/v2/list_movies.json "
+          f"(Ctrl+C to stop)", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
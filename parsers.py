@@ -0,0 +1,253 @@
+import html
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from magnet import trackers_from_magnet
+from rules import DEFAULT_RULES_PATH, ExtractionRules, LinkRule
+
+logger = logging.getLogger("yts.parsers")
+
+TORRENT_HASH_RE = re.compile(r"/torrent/download/([0-9A-Fa-f]{40})/?$")
+
+DEFAULT_BACKEND = "scanner"
+BACKENDS = ("html.parser", "lxml", "strainer", "selectolax", "scanner")
+
+rules = ExtractionRules.load(DEFAULT_RULES_PATH)  # Replaced by use_rules
+
+# Only the tags the extractors look at are built when parsing detail pages with the "strainer" or
+# "scanner" backend: containers of the title, year/genres, rating, download links, per-torrent sizes and tech specs
+_DETAIL_STRAINER = SoupStrainer(
+    class_=re.compile(r"(^|\s)(title|hidden-xs|hidden-md|bottom-info|modal-torrent|tech-spec-info)(\s|$)"))
+_SIZE_RE = re.compile(r"([\d.]+)\s*(GB|MB|KB)", re.IGNORECASE)
+_RUNTIME_RE = re.compile(r"(?:(\d+)\s*hr)?\s*(?:(\d+)\s*min)?", re.IGNORECASE)  # Either part may be missing
+_PEERS_SEEDS_RE = re.compile(r"P/S\s*(\d+)\s*/\s*(\d+)")
+_SIZE_UNITS = {"gb": 1024.0, "mb": 1.0, "kb": 1 / 1024}
+
+def available_backends() -> List[str]:
+    """Backends whose optional dependencies are installed."""
+    backends = ["html.parser", "strainer", "scanner"]
+    try:
+        import lxml  # noqa: F401
+        backends.append("lxml")
+    except ImportError:
+        pass
+    try:
+        import selectolax  # noqa: F401
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    return [name for name in BACKENDS if name in backends]
+
+def check_backend(backend: str) -> None:
+    """Raises ValueError if the backend is unknown or its package is not installed."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend} (choose from {', '.join(BACKENDS)})")
+    if backend not in available_backends():
+        package = "selectolax" if backend == "selectolax" else "lxml"
+        raise ValueError(f"Parser backend {backend} needs the {package} package (pip install {package})")
+
+def use_rules(path: Path) -> None:
+    """Switches this process to the extraction rules in path; also the parse pool's initializer."""
+    global rules, _link_scanner
+    rules = ExtractionRules.load(path)
+    _link_scanner = LinkScanner(rules.movie_link)
+
+def _soup(content: bytes, backend: str, strainer: SoupStrainer) -> BeautifulSoup:
+    if backend == "lxml":
+        return BeautifulSoup(content, "lxml")
+    if backend in ("strainer", "scanner"):
+        return BeautifulSoup(content, "html.parser", parse_only=strainer)
+    return BeautifulSoup(content, "html.parser")
+
+def _selectolax_tree(content: bytes):
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:  # selectolax releases before the lexbor engine
+        from selectolax.parser import HTMLParser
+    return HTMLParser(content)
+
+def _title_from_url(url: str) -> Optional[str]:
+    match = rules.title_from_url.search(url)
+    if not match:
+        logger.warning("Could not extract title from URL: %s", url)
+        return None
+    return match.group(1).replace("-", " ").title()
+
+class LinkScanner:
+    """A link rule compiled into regular expressions that find its links in one pass over the page.
+
+    No tree is built and no other tag is looked at. Comments and script/style bodies are skipped,
+    as an HTML parser would skip them, and attribute values are unescaped like a parser does.
+    """
+
+    def __init__(self, rule: LinkRule):
+        self.rule = rule
+        tag = re.escape(rule.tag)
+        # Group 2 holds the rule tag's attributes; comment and script/style matches leave it empty
+        self._tags = re.compile(r"<!--.*?-->|<(script|style)\b.*?</\1\s*>"
+                                rf"""|<{tag}(\s(?:[^>"']|"[^"]*"|'[^']*')*)?/?>""", re.IGNORECASE | re.DOTALL)
+        self._attribute = re.compile(rf"""\s{re.escape(rule.attribute)}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""",
+                                     re.IGNORECASE)
+
+    def scan(self, text: str) -> List[str]:
+        """The accepted links in text, each once, in page order."""
+        links: Dict[str, None] = {}
+        for tag in self._tags.finditer(text):
+            attributes = tag.group(2)
+            if not attributes:
+                continue
+            match = self._attribute.search(attributes)
+            if not match:
+                continue
+            value = match.group(1) if match.group(1) is not None else match.group(2) or match.group(3)
+            if "&" in value:
+                value = html.unescape(value)
+            if self.rule.accepts(value):
+                links[value] = None
+        return list(links)
+
+_link_scanner = LinkScanner(rules.movie_link)
+
+def extract_movie_links(content: bytes, backend: str = DEFAULT_BACKEND) -> List[str]:
+    """Returns the unique movie links found in a browse page, in page order."""
+    rule = rules.movie_link
+    if backend == "scanner":
+        return _link_scanner.scan(content.decode("utf-8", errors="replace"))
+    if backend == "selectolax":
+        hrefs = (node.attributes.get(rule.attribute) for node in _selectolax_tree(content).css(rule.selector))
+    else:
+        strainer = SoupStrainer(rule.tag, attrs={rule.attribute: True})
+        hrefs = (link.get(rule.attribute) for link in _soup(content, backend, strainer).find_all(rule.tag))
+    return list(dict.fromkeys(href for href in hrefs if rule.accepts(href)))
+
+def parse_size_mb(text: str) -> Optional[float]:
+    """Converts a size such as "1.49 GB" to megabytes."""
+    match = _SIZE_RE.search(text or "")
+    if not match:
+        return None
+    return round(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()], 2)
+
+def parse_runtime_min(text: str) -> Optional[int]:
+    """Converts a runtime such as "1 hr 36 min" to minutes."""
+    for match in _RUNTIME_RE.finditer(text or ""):
+        if any(match.groups()):
+            return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+    return None
+
+def _tech_spec(texts: List[str]) -> Dict[str, Optional[int]]:
+    """Runtime, peers and seeds from the text of one tech-spec-info block's cells."""
+    spec = {"runtime": None, "peers": None, "seeds": None}
+    for text in texts:
+        match = _PEERS_SEEDS_RE.search(text)
+        if match:
+            spec["peers"], spec["seeds"] = int(match.group(1)), int(match.group(2))
+        elif spec["runtime"] is None and ("hr" in text or "min" in text):
+            spec["runtime"] = parse_runtime_min(text)
+    return spec
+
+def torrent_option(label: str, url: str, size_mb: Optional[float] = None,
+                   trackers: Optional[List[str]] = None, seeds: Optional[int] = None,
+                   peers: Optional[int] = None) -> Dict[str, Any]:
+    """Describes one download link from its label, e.g. "1080p.x265.BluRay"."""
+    parts = label.strip().split(".")
+    lowered = [part.lower() for part in parts]
+    match = TORRENT_HASH_RE.search(url)
+    return {
+        "quality": lowered[0],
+        "codec": "x265" if "x265" in lowered else "x264",
+        "type": parts[-1] if len(parts) > 1 and lowered[-1] != "x265" else None,
+        "size_mb": size_mb,
+        "seeds": seeds,
+        "peers": peers,
+        "url": url,
+        "hash": match.group(1).upper() if match else None,
+        "trackers": trackers or [],
+    }
+
+def _movie_facts(h2_texts: List[str], rating_text: Optional[str]) -> Dict[str, Any]:
+    year = int(h2_texts[0]) if h2_texts and h2_texts[0].isdigit() else None
+    genres = [genre.strip() for genre in h2_texts[1].split("/") if genre.strip()] if len(h2_texts) > 1 else []
+    try:
+        rating = float(rating_text) if rating_text else None
+    except ValueError:
+        rating = None
+    return {"year": year, "rating": rating, "genres": genres}
+
+def _soup_fields(soup: BeautifulSoup) -> Tuple[Optional[str], List[Tuple[str, str]], Dict[str, Any], Dict[str, Dict],
+                                                Dict[str, Dict]]:
+    title_tag = soup.find("h1", class_="title")
+    title = title_tag.text.strip() if title_tag else None
+    download_section = soup.find("p", class_="hidden-md hidden-lg")
+    links = [(link.get("href"), link.text)
+             for link in download_section.find_all("a", rel="nofollow")] if download_section else []
+    rating_tag = soup.select_one("span[itemprop=ratingValue]")
+    facts = _movie_facts([h2.text.strip() for h2 in soup.select("div.hidden-xs h2")],
+                         rating_tag.text.strip() if rating_tag else None)
+    extras = {}
+    for modal in soup.select("div.modal-torrent"):
+        link = modal.select_one("a.download-torrent[href]")
+        if not link:
+            continue
+        size_tags = modal.select("p.quality-size")
+        magnet = modal.select_one("a.magnet-download[href]")
+        extras[link.get("href")] = {
+            "size_mb": parse_size_mb(size_tags[-1].text) if size_tags else None,
+            "trackers": trackers_from_magnet(magnet.get("href")) if magnet else [],
+        }
+    specs = {block.get("id"): _tech_spec([cell.get_text() for cell in block.select("div.tech-spec-element")])
+             for block in soup.select("div.tech-spec-info[id]")}
+    return title, links, facts, extras, specs
+
+def _selectolax_fields(tree) -> Tuple[Optional[str], List[Tuple[str, str]], Dict[str, Any], Dict[str, Dict],
+                                      Dict[str, Dict]]:
+    title_tag = tree.css_first("h1.title")
+    title = title_tag.text().strip() if title_tag else None
+    download_section = tree.css_first("p.hidden-md.hidden-lg")
+    links = [(node.attributes.get("href"), node.text())
+             for node in download_section.css("a[rel~=nofollow]")] if download_section else []
+    rating_tag = tree.css_first("span[itemprop=ratingValue]")
+    facts = _movie_facts([h2.text().strip() for h2 in tree.css("div.hidden-xs h2")],
+                         rating_tag.text().strip() if rating_tag else None)
+    extras = {}
+    for modal in tree.css("div.modal-torrent"):
+        link = modal.css_first("a.download-torrent[href]")
+        if not link:
+            continue
+        size_tags = modal.css("p.quality-size")
+        magnet = modal.css_first("a.magnet-download[href]")
+        extras[link.attributes.get("href")] = {
+            "size_mb": parse_size_mb(size_tags[-1].text()) if size_tags else None,
+            "trackers": trackers_from_magnet(magnet.attributes.get("href")) if magnet else [],
+        }
+    specs = {block.attributes.get("id"): _tech_spec([cell.text() for cell in block.css("div.tech-spec-element")])
+             for block in tree.css("div.tech-spec-info[id]")}
+    return title, links, facts, extras, specs
+
+def extract_movie_details(content: bytes, url: str, backend: str = DEFAULT_BACKEND) -> Optional[Dict[str, Any]]:
+    """Returns a movie page's title, year, rating, genres, runtime and every torrent option it offers.
+
+    Returns None when no usable title can be found.
+    """
+    if backend == "selectolax":
+        title, links, facts, extras, specs = _selectolax_fields(_selectolax_tree(content))
+    else:
+        title, links, facts, extras, specs = _soup_fields(_soup(content, backend, _DETAIL_STRAINER))
+
+    if not title:
+        title = _title_from_url(url)
+        if not title:
+            return None
+
+    torrents = []
+    for href, text in links:
+        if href and rules.torrent_link.search(href):
+            extra = extras.get(href, {})
+            spec = specs.get(text.strip(), {})  # Tech spec blocks are keyed by the link label
+            torrents.append(torrent_option(text, href, extra.get("size_mb"), extra.get("trackers"),
+                                           spec.get("seeds"), spec.get("peers")))
+    runtime = next((spec["runtime"] for spec in specs.values() if spec["runtime"]), None)
+    return {"title": title, **facts, "runtime": runtime, "torrents": torrents}
@@ -0,0 +1,35 @@
+import re
+from typing import Any, Dict, Mapping, Optional
+
+# Statuses telling that a server does not answer HEAD requests, so a one-byte Range GET is tried instead
+HEAD_UNSUPPORTED = (400, 403, 405, 501)
+PROBE_RANGE = {"Range": "bytes=0-0"}
+_CONTENT_RANGE_RE = re.compile(r"/(\d+)\s*$")
+
+def response_validators(status: int, headers: Mapping[str, str]) -> Dict[str, Any]:
+    """The ETag, Last-Modified and full body length a response reports, for the crawl state.
+
+    Works for full responses, HEAD responses and 206 answers to a Range request, whose
+    Content-Range carries the full length. Fields a server did not send are None.
+    """
+    length = None
+    if status == 206:
+        match = _CONTENT_RANGE_RE.search(headers.get("Content-Range", ""))
+        length = int(match.group(1)) if match else None
+    elif (headers.get("Content-Length") or "").isdigit():
+        length = int(headers["Content-Length"])
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"), "content_length": length}
+
+def unchanged(stored: Optional[Mapping[str, Any]], current: Optional[Mapping[str, Any]]) -> bool:
+    """True when current validators show the resource is the one stored validators were taken from.
+
+    ETags decide when both sides have one. Otherwise every field both sides have must match, and
+    at least one must be there; with nothing to compare the resource counts as changed.
+    """
+    if not stored or not current:
+        return False
+    if stored.get("etag") and current.get("etag"):
+        return stored["etag"] == current["etag"]
+    shared = [name for name in ("last_modified", "content_length")
+              if stored.get(name) is not None and current.get(name) is not None]
+    return bool(shared) and all(stored[name] == current[name] for name in shared)
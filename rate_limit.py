@@ -0,0 +1,105 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+MIN_RATE = 0.1  # Requests per second a host is never throttled below
+MAX_PAUSE = 300.0  # Longest Retry-After we are willing to honour, in seconds
+LATENCY_TARGET = 2.0  # Responses slower than this (seconds) count as the server struggling
+THROTTLED_STATUSES = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HostBucket:
+    """Token bucket for one host whose refill rate follows the server's health."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class AdaptiveRateLimiter:
+    """Per-host token buckets that slow down on errors, 429/503 and slow responses.
+
+    Healthy responses raise a host's rate additively up to max_rate; throttling responses and
+    connection errors halve it, and Retry-After pauses the host entirely (AIMD).
+    """
+
+    def __init__(self, max_rate: float):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, HostBucket] = {}
+        self.set_rate(max_rate)
+
+    def set_rate(self, max_rate: float) -> None:
+        """Sets the per-host ceiling; 0 disables rate limiting."""
+        self.max_rate = max_rate
+        with self._lock:
+            self._buckets.clear()
+
+    def _bucket(self, url: str) -> HostBucket:
+        host = urlparse(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = HostBucket(self.max_rate)
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """Takes a token for the URL's host if one is free; otherwise returns the seconds to wait first.
+
+        Never blocks, so an event loop can sleep the returned delay without holding up other requests.
+        """
+        if not self.max_rate:
+            return 0.0
+        with self._lock:
+            bucket = self._bucket(url)
+            now = time.monotonic()
+            bucket.refill(now)
+            if now >= bucket.paused_until and bucket.tokens >= 1.0:
+                bucket.tokens -= 1.0
+                return 0.0
+            return max(bucket.paused_until - now, (1.0 - bucket.tokens) / bucket.rate)
+
+    def acquire(self, url: str) -> None:
+        """Blocks until the URL's host may receive another request."""
+        while True:
+            delay = self.reserve(url)
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def record(self, url: str, latency: float, status: Optional[int] = None,
+               retry_after: Optional[str] = None) -> None:
+        """Adapts the host's rate to a finished request; status None means it failed outright."""
+        if not self.max_rate:
+            return
+        with self._lock:
+            bucket = self._bucket(url)
+            if status is None or status in THROTTLED_STATUSES:
+                bucket.rate = max(MIN_RATE, bucket.rate / 2)
+                pause = parse_retry_after(retry_after)
+                if pause:
+                    bucket.paused_until = max(bucket.paused_until, time.monotonic() + min(pause, MAX_PAUSE))
+            elif latency > LATENCY_TARGET:
+                bucket.rate = max(MIN_RATE, bucket.rate * 0.9)
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.max_rate / 10)
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(f"{host} {bucket.rate:.2f} req/s" for host, bucket in self._buckets.items())
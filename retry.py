@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import requests
+
+T = TypeVar("T")
+logger = logging.getLogger("yts.retry")
+
+DEFAULT_RETRIES = 3  # Extra attempts for one request within a run
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+# Statuses worth asking again for; any other HTTP error will not fix itself
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(error: Exception) -> bool:
+    """Classifies a request failure as transient (retry) or fatal (give up now)."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.ContentDecodingError,
+    ))
+
+def is_fatal(error: Exception) -> bool:
+    """True for request failures a later attempt will not fix either, such as a 404 page."""
+    return isinstance(error, requests.exceptions.RequestException) and not is_retryable(error)
+
+def backoff_delay(attempt: int, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> float:
+    """Exponential backoff with full jitter, so concurrent workers do not retry in lockstep."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def call_with_retries(func: Callable[[], T], description: str, retries: int = DEFAULT_RETRIES) -> T:
+    """Calls func, retrying transient request errors; the last or any fatal error is re-raised."""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except requests.exceptions.RequestException as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            logger.warning("Retrying %s in %.1fs (attempt %d/%d) after: %s", description, delay, attempt + 1, retries + 1, e)
+            time.sleep(delay)
+
+async def call_with_retries_async(func: Callable[[], Awaitable[T]], description: str, retries: int = DEFAULT_RETRIES) -> T:
+    """call_with_retries for coroutines: backing off sleeps only the calling task, not the event loop."""
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except requests.exceptions.RequestException as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            logger.warning("Retrying %s in %.1fs (attempt %d/%d) after: %s", description, delay, attempt + 1, retries + 1, e)
+            await asyncio.sleep(delay)
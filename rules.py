@@ -0,0 +1,68 @@
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Pattern
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / "rules.json"
+
+_SELECTOR_RE = re.compile(r"^([A-Za-z][\w-]*)\[([A-Za-z_][\w:-]*)\]$")
+
+def _compile(name: str, pattern: Any) -> Pattern[str]:
+    if not isinstance(pattern, str):
+        raise ValueError(f"Rule {name} needs a regular expression string")
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Rule {name} has an invalid regular expression: {e}") from None
+
+@dataclass(frozen=True)
+class LinkRule:
+    """Links to collect: the attribute of every tag[attribute] element whose value matches pattern."""
+    tag: str
+    attribute: str
+    pattern: Pattern[str]
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "LinkRule":
+        match = _SELECTOR_RE.match(str(data.get("selector", "")))
+        if not match:
+            raise ValueError(f"Rule {name} needs a selector of the form tag[attribute], e.g. a[href]")
+        return cls(match.group(1).lower(), match.group(2).lower(), _compile(name, data.get("pattern")))
+
+    @property
+    def selector(self) -> str:
+        return f"{self.tag}[{self.attribute}]"
+
+    def accepts(self, value: Optional[str]) -> bool:
+        return bool(value) and self.pattern.search(value) is not None
+
+@dataclass(frozen=True)
+class ExtractionRules:
+    """Where the parsers find movie links, torrent links and fallback titles, compiled once.
+
+    Loaded from rules.json, so a change in the site's link layout is a config edit, not a code change.
+    """
+    movie_link: LinkRule
+    torrent_link: Pattern[str]  # Download links on a detail page
+    title_from_url: Pattern[str]  # Group 1 is the slug used when a detail page has no title
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractionRules":
+        names = ("movie_link", "torrent_link", "title_from_url")
+        unknown = set(data) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown extraction rules: {', '.join(sorted(unknown))}")
+        missing = [name for name in names if name not in data]
+        if missing:
+            raise ValueError(f"Missing extraction rules: {', '.join(missing)}")
+        if not isinstance(data["movie_link"], dict):
+            raise ValueError("Rule movie_link needs a selector and a pattern")
+        return cls(LinkRule.from_dict("movie_link", data["movie_link"]),
+                   _compile("torrent_link", data["torrent_link"]),
+                   _compile("title_from_url", data["title_from_url"]))
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_RULES_PATH) -> "ExtractionRules":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
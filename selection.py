@@ -0,0 +1,84 @@
+import json
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STRING_LIST_KEYS = ("genres", "qualities", "codecs")
+NUMBER_KEYS = ("min_rating", "min_year", "max_year", "max_size_mb")
+
+@dataclass
+class SelectionSpec:
+    """Which genres to crawl and which torrent to pick for each movie.
+
+    qualities is a preference order: the first quality with a torrent that passes the codec and
+    size filters wins. codecs is a preference order too, deciding between torrents of that
+    quality. The defaults reproduce the original behaviour (1080p animation, any codec).
+    """
+    genres: List[str] = field(default_factory=lambda: ["animation"])
+    qualities: List[str] = field(default_factory=lambda: ["1080p"])
+    codecs: Optional[List[str]] = None  # e.g. ["x265", "x264"], best first; None accepts any codec
+    min_rating: Optional[float] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    max_size_mb: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SelectionSpec":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown selection spec keys: {', '.join(sorted(unknown))}")
+        # A JSON string where a list belongs would otherwise be read one character at a time
+        for name in STRING_LIST_KEYS:
+            value = data.get(name)
+            if value is not None and not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+                raise ValueError(f"Selection spec key {name} must be a list of strings")
+        for name in NUMBER_KEYS:
+            value = data.get(name)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"Selection spec key {name} must be a number")
+        spec = cls(**data)
+        if not spec.genres or not spec.qualities:
+            raise ValueError("Selection spec needs at least one genre and one quality")
+        spec.genres = [genre.lower() for genre in spec.genres]
+        spec.qualities = [quality.lower() for quality in spec.qualities]
+        if spec.codecs is not None:
+            spec.codecs = [codec.lower() for codec in spec.codecs]
+        return spec
+
+    @classmethod
+    def load(cls, path: Path) -> "SelectionSpec":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def accepts_movie(self, record: Dict[str, Any]) -> bool:
+        """Movie-level filters; a missing rating or year never excludes a movie."""
+        rating, year = record.get("rating"), record.get("year")
+        if self.min_rating is not None and rating is not None and rating < self.min_rating:
+            return False
+        if self.min_year is not None and year is not None and year < self.min_year:
+            return False
+        if self.max_year is not None and year is not None and year > self.max_year:
+            return False
+        return True
+
+    def choose(self, torrents: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The preferred torrent among a movie's options, or None if none qualifies.
+
+        Quality decides first and codec second; among equals the first option listed wins.
+        """
+        for quality in self.qualities:
+            candidates = []
+            for torrent in torrents:
+                if (torrent.get("quality") or "").lower() != quality:
+                    continue
+                codec = (torrent.get("codec") or "").lower()
+                if self.codecs is not None and codec not in self.codecs:
+                    continue
+                size_mb = torrent.get("size_mb")
+                if self.max_size_mb is not None and size_mb is not None and size_mb > self.max_size_mb:
+                    continue
+                candidates.append((self.codecs.index(codec) if self.codecs is not None else 0, torrent))
+            if candidates:
+                return min(candidates, key=lambda candidate: candidate[0])[1]
+        return None
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # The scraper's modules live at the top of the repository
+
+import f1  # noqa: E402
+import mock_server  # noqa: E402
+import retry  # noqa: E402
+from rate_limit import AdaptiveRateLimiter  # noqa: E402
+
+# Module globals that f1.main and the tests replace
+F1_STATE = ("http_cache", "parser_backend", "parse_pool", "request_retries", "selection", "chunk_size", "mirrors",
+            "output_mode", "probe_mode", "exporter", "frontier", "async_client")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mock_site(**kwargs): arguments for mock_server.start_server")
+
+@pytest.fixture(autouse=True)
+def f1_state(monkeypatch):
+    """Gives every test its own session, rate limiter and torrent stores, and restores f1's globals afterwards."""
+    for name in F1_STATE:
+        monkeypatch.setattr(f1, name, getattr(f1, name))
+    monkeypatch.setattr(f1, "session", f1.create_session(f1.DEFAULT_WORKERS))
+    monkeypatch.setattr(f1, "rate_limiter", AdaptiveRateLimiter(0))
+    monkeypatch.setattr(f1, "_torrent_stores", {})
+    yield
+    for store in f1._torrent_stores.values():
+        store.close()
+    f1.session.close()
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Retries go out at once, so runs against a failing mock server stay fast."""
+    monkeypatch.setattr(retry, "backoff_delay", lambda attempt, base=0.0, cap=0.0: 0.0)
+
+@pytest.fixture
+def mock_site(request, no_backoff):
+    """A mock YTS server for one test; mark a test with mock_site(movies=..., error_rate=...) to configure it."""
+    marker = request.node.get_closest_marker("mock_site")
+    server, base_url = mock_server.start_server(0, **(marker.kwargs if marker else {"movies": 20}))
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,28 @@
+import hashlib
+
+import pytest
+
+import bencode
+
+def test_info_hash_is_the_sha1_of_the_info_dictionary_as_written():
+    # Keys out of order: a re-encoding would sort them and hash different bytes
+    info = b"d4:name9:movie.mp46:lengthi1024ee"
+    torrent = b"d8:announce3:udp4:info" + info + b"e"
+    assert bencode.info_hash(torrent) == hashlib.sha1(info).hexdigest().upper()
+    assert bencode.decode(torrent)[b"info"][b"name"] == b"movie.mp4"
+
+def test_round_trip_sorts_dictionary_keys():
+    value = {"b": [1, -2, b"x"], "a": {"nested": "yes"}}
+    encoded = bencode.encode(value)
+    assert encoded == b"d1:ad6:nested3:yese1:bli1ei-2e1:xee"
+    assert bencode.decode(encoded) == {b"a": {b"nested": b"yes"}, b"b": [1, -2, b"x"]}
+
+@pytest.mark.parametrize("data", [
+    b"d8:announce3:udp4:infod4:name",  # Truncated, as an interrupted download leaves it
+    b"d4:infod4:name1:xee trailing",
+    b"<html>Not found</html>",
+    b"d8:announce3:udpe",  # Well-formed, but not a torrent
+])
+def test_info_hash_rejects_anything_but_a_complete_torrent(data):
+    with pytest.raises(ValueError):
+        bencode.info_hash(data)
@@ -0,0 +1,39 @@
+import pytest
+
+from frontier import Frontier, SpillBuffer
+
+def test_spill_buffer_stays_first_in_first_out_across_a_spill(tmp_path):
+    buffer = SpillBuffer(tmp_path / "queue.jsonl", memory_items=3)
+    try:
+        taken = []
+        for item in range(10):
+            buffer.append(item)
+            if item % 4 == 3:  # Readers take some items while the file still holds others
+                taken.append(buffer.popleft())
+        assert buffer.spilled > 0
+        while len(buffer):
+            taken.append(buffer.popleft())
+        assert taken == list(range(10))
+
+        # Once read back the file starts over, and the buffer keeps its order for the next items
+        assert (tmp_path / "queue.jsonl").stat().st_size == 0
+        for item in ["a", "b", "c", "d", "e"]:
+            buffer.append(item)
+        assert [buffer.popleft() for _ in range(5)] == ["a", "b", "c", "d", "e"]
+        with pytest.raises(IndexError):
+            buffer.popleft()
+    finally:
+        buffer.close()
+    assert not (tmp_path / "queue.jsonl").exists()
+
+@pytest.mark.parametrize("mode", ["memory", "disk"])
+def test_frontier_returns_new_urls_per_scope_whatever_the_host(tmp_path, mode):
+    frontier = Frontier(mode, tmp_path / "frontier", memory_mb=0.01)
+    try:
+        assert frontier.add(["https://yts.mx/movies/a", "https://yts.mx/movies/b", "https://yts.mx/movies/a"]) == \
+            ["https://yts.mx/movies/a", "https://yts.mx/movies/b"]
+        assert frontier.add(["https://mirror.example/movies/b/", "https://yts.mx/movies/c"]) == \
+            ["https://yts.mx/movies/c"]
+        assert frontier.add(["https://yts.mx/movies/a"], scope="another listing") == ["https://yts.mx/movies/a"]
+    finally:
+        frontier.close()
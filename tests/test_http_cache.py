@@ -0,0 +1,56 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import http_cache
+from http_cache import HttpCache
+
+def make_response(url: str, status: int = 200, body: bytes = b"", etag: str = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response._content = body
+    response._content_consumed = True  # Read in full, as requests leaves a non-streamed response
+    if etag:
+        response.headers["ETag"] = etag
+    return response
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(http_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))  # Distinct, ordered
+    cache = HttpCache(tmp_path, ttl=3600, max_bytes=250)
+    yield cache
+    cache.close()
+
+def test_least_recently_used_page_is_evicted(cache):
+    sent = []
+
+    def send(url, **kwargs):
+        sent.append(url)
+        return make_response(url, body=b"x" * 100)
+
+    for url in ("https://yts.mx/a", "https://yts.mx/b", "https://yts.mx/a", "https://yts.mx/c"):
+        cache.fetch(send, url)
+    assert sent == ["https://yts.mx/a", "https://yts.mx/b", "https://yts.mx/c"]  # The second a was a hit
+    assert cache.stats["evictions"] == 1
+
+    for url in ("https://yts.mx/a", "https://yts.mx/c", "https://yts.mx/b"):
+        cache.fetch(send, url)
+    assert sent[3:] == ["https://yts.mx/b"]  # b was used least recently when c came in
+
+def test_stale_page_is_revalidated_with_its_etag(cache):
+    url = "https://yts.mx/movies/up-2009"
+    cache.fetch(lambda url, **kwargs: make_response(url, body=b"page", etag='"v1"'), url)
+    seen_headers = []
+
+    def send(url, headers=None, **kwargs):
+        seen_headers.append(headers)
+        return make_response(url, status=304)
+
+    response = cache.fetch(send, url, max_age=0)
+    assert seen_headers == [{"If-None-Match": '"v1"'}]
+    assert (response.status_code, response.content) == (200, b"page")
+    assert cache.stats["revalidated"] == 1
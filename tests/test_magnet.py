@@ -0,0 +1,34 @@
+import itertools
+from types import SimpleNamespace
+
+import crawl_state as crawl_state_module
+from crawl_state import CrawlState
+from magnet import DEFAULT_TRACKERS, magnet_uri, trackers_from_magnet, write_magnet_file
+
+HASH_A, HASH_B = "A" * 40, "b" * 40
+
+def test_magnet_uri_carries_hash_name_and_trackers():
+    uri = magnet_uri(HASH_B, "Up (2009)", ["udp://tracker.example:80"])
+    assert uri.startswith(f"magnet:?xt=urn:btih:{HASH_B.upper()}&dn=Up%20%282009%29&tr=")
+    assert trackers_from_magnet(uri) == ["udp://tracker.example:80"]
+    assert trackers_from_magnet(magnet_uri(HASH_A, "x")) == DEFAULT_TRACKERS
+
+def test_magnet_file_has_each_release_once_in_discovery_order(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(crawl_state_module, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+    state = CrawlState(tmp_path / "state.sqlite3")
+    try:
+        movies = [("https://yts.mx/movies/b", HASH_B, "B"), ("https://yts.mx/movies/a", HASH_A, "A"),
+                  ("https://yts.mx/movies/b-again", HASH_B, "B again"), ("https://yts.mx/movies/c", None, "C")]
+        for url, info_hash, title in movies:
+            state.discover([url])
+        for url, info_hash, title in movies:
+            if info_hash:
+                state.mark_exported(url, magnet_uri(info_hash, title))
+
+        path = tmp_path / "magnets.txt"
+        assert write_magnet_file(path, state.exported_magnets()) == 2
+        assert path.read_text().splitlines() == [magnet_uri(HASH_B, "B"), magnet_uri(HASH_A, "A")]
+        assert not (tmp_path / "magnets.txt.part").exists()
+    finally:
+        state.close()
@@ -0,0 +1,51 @@
+import pytest
+
+import mirrors
+from mirrors import MAX_CONSECUTIVE_ERRORS, MirrorPool
+
+SITE = "https://yts.mx"
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(mirrors.time, "monotonic", lambda: now[0])
+    return now
+
+@pytest.mark.parametrize("url, canonical", [
+    ("/movies/up-2009", f"{SITE}/movies/up-2009"),
+    ("https://YTS.LT:443/movies/up-2009#comments", f"{SITE}/movies/up-2009"),
+    ("http://127.0.0.1:8000/browse-movies?page=2", f"{SITE}/browse-movies?page=2"),
+    ("https://example.org/elsewhere#top", "https://example.org/elsewhere"),
+])
+def test_normalize_moves_mirror_urls_to_the_canonical_domain(url, canonical):
+    pool = MirrorPool(["https://yts.lt", "http://127.0.0.1:8000"], SITE)
+    assert pool.normalize(url) == canonical
+
+def test_route_picks_the_fastest_healthy_mirror(clock):
+    pool = MirrorPool(["https://a.example", "https://b.example"], SITE)
+    pool.observe("https://a.example/robots.txt", 200, 0.5)
+    pool.observe("https://b.example/robots.txt", 200, 0.1)
+    assert pool.route(f"{SITE}/movies/up-2009") == "https://b.example/movies/up-2009"
+    assert pool.route("https://example.org/movies/up-2009") == "https://example.org/movies/up-2009"
+
+    for _ in range(MAX_CONSECUTIVE_ERRORS):
+        pool.observe("https://b.example/movies/up-2009", 503, 0.1)
+    assert pool.route(f"{SITE}/movies/up-2009") == "https://a.example/movies/up-2009"
+    clock[0] += mirrors.COOLDOWN
+    for _ in range(4):  # The prober sees it come back; its recent errors weigh on it for a few probes
+        pool.observe("https://b.example/robots.txt", 200, 0.1)
+    assert pool.route(f"{SITE}/movies/up-2009") == "https://b.example/movies/up-2009"
+
+def test_route_follows_cached_redirects(clock):
+    pool = MirrorPool(["https://a.example"], SITE)
+    # A permanent redirect to the same path aliases the whole domain
+    pool.observe("https://a.example/movies/up-2009", 200, 0.1, "https://new.example/movies/up-2009", [301])
+    assert pool.route(f"{SITE}/browse-movies") == "https://new.example/browse-movies"
+    assert pool.is_site("https://new.example/movies/up-2009")
+
+    # Any other redirect is remembered for that URL only, and a temporary one for a while
+    pool.observe("https://new.example/movies/old", 200, 0.1, "https://new.example/movies/new", [302])
+    assert pool.route(f"{SITE}/movies/old") == "https://new.example/movies/new"
+    clock[0] += mirrors.REDIRECT_TTL + 1
+    assert pool.route(f"{SITE}/movies/old") == "https://new.example/movies/old"
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+import parsers
+from parsers import LinkScanner, available_backends, extract_movie_details, extract_movie_links
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+DETAIL_PAGES = {"toy-story-1995.html": "https://yts.mx/movies/toy-story-1995",
+                "up-2009.html": "https://yts.mx/movies/up-2009"}
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_find_the_links_html_parser_finds(backend):
+    page = (FIXTURES / "browse.html").read_bytes()
+    links = extract_movie_links(page, backend)
+    assert links
+    assert links == extract_movie_links(page, "html.parser")
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("fixture", list(DETAIL_PAGES))
+def test_backends_read_detail_pages_like_html_parser(backend, fixture):
+    page, url = (FIXTURES / fixture).read_bytes(), DETAIL_PAGES[fixture]
+    details = extract_movie_details(page, url, backend)
+    assert details["title"] and details["torrents"]
+    assert details == extract_movie_details(page, url, "html.parser")
+
+def test_scanner_skips_what_a_parser_skips_and_unescapes_like_one():
+    page = b"""
+        <a href="/movies/first">First</a>
+        <!-- <a href="/movies/commented-out">Gone</a> -->
+        <script>document.write('<a href="/movies/from-script">');</script>
+        <A class='card' HREF='/movies/single-quoted'>Single</A>
+        <a href=/movies/unquoted>Unquoted</a>
+        <a data-x=">" href="https://yts.mx/movies/escaped?a=1&amp;b=2">Escaped</a>
+        <a href="/browse-movies">Not a movie</a>
+        <a name="top">No link</a>
+        <a href="/movies/first">First again</a>
+    """
+    links = LinkScanner(parsers.rules.movie_link).scan(page.decode())
+    assert links == ["/movies/first", "/movies/single-quoted", "/movies/unquoted",
+                     "https://yts.mx/movies/escaped?a=1&b=2"]
+    assert links == extract_movie_links(page, "html.parser")
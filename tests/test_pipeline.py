@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+import bencode
+import f1
+from crawl_state import CrawlState
+
+def crawl(base_url: str, *args: str) -> f1.CrawlStats:
+    return f1.main(["--site-url", base_url, "--api-url", base_url + "/api/v2/list_movies.json", "--max-rps", "0",
+                    "--progress-interval", "0", "--log-level", "ERROR", *args])
+
+ENGINES = {
+    "html": [],
+    "api": ["--engine", "api"],
+    "async": ["--async"],
+}
+
+@pytest.mark.mock_site(movies=20, error_rate=0.2)
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_crawl_survives_server_errors(mock_site, tmp_path, monkeypatch, engine):
+    if engine == "async":
+        pytest.importorskip("httpx")
+    monkeypatch.chdir(tmp_path)
+    stats = crawl(mock_site[1], "--retries", "8", *ENGINES[engine])
+
+    assert (stats.movies, stats.downloaded, stats.failed) == (20, 20, 0)
+    torrents = sorted(Path("movies").glob("*.torrent"))
+    assert len(torrents) == 20
+    for path in torrents:
+        bencode.info_hash(path.read_bytes())  # Raises for a truncated or interleaved file
+
+
+
+@pytest.mark.mock_site(movies=20)
+def test_probe_fetches_only_changed_pages(mock_site, tmp_path, monkeypatch):
+    server, base_url = mock_site
+    monkeypatch.chdir(tmp_path)
+    assert crawl(base_url).downloaded == 20
+
+    details = server.RequestHandlerClass.site.details
+    slug = next(iter(details))
+    details[slug] = details[slug].replace(b">Mock Movie 0001<", b">Changed Movie 0001<")
+    stats = crawl(base_url, "--probe")
+    assert (stats.unchanged, stats.downloaded) == (19, 1)
+    state = CrawlState(Path("movies/crawl_state.sqlite3"))
+    try:
+        # Fetched again past the HTTP cache, and with the new page's validators recorded
+        assert state.get(f"{f1.SITE_URL}/movies/{slug}")["title"] == "Changed Movie 0001"
+    finally:
+        state.close()
+
+    assert crawl(base_url, "--probe").unchanged == 20
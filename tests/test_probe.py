@@ -0,0 +1,29 @@
+import pytest
+
+from probe import response_validators, unchanged
+
+def validators(etag=None, last_modified=None, content_length=None):
+    return {"etag": etag, "last_modified": last_modified, "content_length": content_length}
+
+@pytest.mark.parametrize("status, headers, expected", [
+    (200, {"ETag": '"v1"', "Content-Length": "5120"}, validators('"v1"', content_length=5120)),
+    (206, {"Content-Range": "bytes 0-0/5120", "Content-Length": "1",
+           "Last-Modified": "Tue, 01 Sep 2026 10:00:00 GMT"},
+     validators(last_modified="Tue, 01 Sep 2026 10:00:00 GMT", content_length=5120)),
+    (206, {"Content-Range": "bytes 0-0/*"}, validators()),
+    (200, {"Content-Length": "chunked?"}, validators()),
+])
+def test_response_validators(status, headers, expected):
+    assert response_validators(status, headers) == expected
+
+@pytest.mark.parametrize("stored, current, expected", [
+    (validators('"v1"', content_length=10), validators('"v1"', content_length=11), True),  # ETags decide
+    (validators('"v1"'), validators('"v2"'), False),
+    (validators(last_modified="a", content_length=10), validators('"v1"', "a", 10), True),
+    (validators(last_modified="a", content_length=10), validators(last_modified="a", content_length=11), False),
+    (validators(content_length=10), validators(last_modified="a"), False),  # Nothing to compare
+    (None, validators('"v1"'), False),
+    (validators('"v1"'), None, False),
+])
+def test_unchanged(stored, current, expected):
+    assert unchanged(stored, current) is expected
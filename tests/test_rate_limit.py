@@ -0,0 +1,37 @@
+import pytest
+
+from rate_limit import MAX_PAUSE, MIN_RATE, AdaptiveRateLimiter, parse_retry_after
+
+URL = "https://yts.mx/browse-movies"
+
+def test_throttling_halves_the_rate_and_healthy_responses_restore_it():
+    limiter = AdaptiveRateLimiter(4.0)
+    limiter.record(URL, 0.1, 503)
+    limiter.record(URL, 0.1, None)  # Connection error
+    assert limiter._bucket(URL).rate == 1.0
+    for _ in range(10):
+        limiter.record(URL, 0.1, 200)
+    assert limiter._bucket(URL).rate == 4.0  # Additive increase, capped at the ceiling
+    for _ in range(20):
+        limiter.record(URL, 0.1, 429)
+    assert limiter._bucket(URL).rate == MIN_RATE
+
+def test_retry_after_pauses_only_that_host():
+    limiter = AdaptiveRateLimiter(100.0)
+    assert limiter.reserve(URL) == 0.0
+    limiter.record(URL, 0.1, 429, "30")
+    assert limiter.reserve(URL) == pytest.approx(30.0, abs=1.0)
+    assert limiter.reserve("https://mirror.example/browse-movies") == 0.0
+
+def test_retry_after_is_capped_and_parsed_in_both_forms():
+    limiter = AdaptiveRateLimiter(100.0)
+    limiter.record(URL, 0.1, 503, "86400")
+    assert limiter.reserve(URL) <= MAX_PAUSE
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # A date in the past
+    assert parse_retry_after("soon") is None
+
+def test_zero_rate_disables_limiting():
+    limiter = AdaptiveRateLimiter(0)
+    limiter.record(URL, 0.1, 429, "60")
+    assert limiter.reserve(URL) == 0.0
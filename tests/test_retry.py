@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+import f1
+import retry
+from crawl_state import DEAD_LETTER, CrawlState
+from mirrors import MirrorPool
+
+def http_error(status: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status} error", response=response)
+
+def test_transient_errors_are_retried_and_others_are_fatal():
+    assert retry.is_retryable(http_error(503))
+    assert retry.is_retryable(requests.exceptions.ConnectionError())
+    assert retry.is_fatal(http_error(404))
+    assert retry.is_fatal(requests.exceptions.InvalidURL())
+    assert not retry.is_fatal(requests.exceptions.Timeout())
+    assert not retry.is_fatal(ValueError("not a request error"))
+
+@pytest.mark.parametrize("error, calls", [(http_error(503), 4), (http_error(404), 1)])
+def test_call_with_retries_gives_up_after_the_budget_or_a_fatal_error(no_backoff, error, calls):
+    attempts = []
+
+    def fail():
+        attempts.append(1)
+        raise error
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        retry.call_with_retries(fail, "test", retries=3)
+    assert len(attempts) == calls
+
+def test_call_with_retries_returns_once_a_retry_succeeds(no_backoff):
+    results = iter([requests.exceptions.ConnectionError(), "ok"])
+
+    def flaky():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert retry.call_with_retries(flaky, "test") == "ok"
+
+@pytest.fixture
+def site(mock_site, monkeypatch):
+    monkeypatch.setattr(f1, "mirrors", MirrorPool([mock_site[1]], f1.SITE_URL))
+    return mock_site
+
+@pytest.mark.mock_site(movies=3, error_rate=1.0)
+def test_torrent_download_is_retried_in_one_loop(site, tmp_path, monkeypatch):
+    sent = []
+    send = f1._send
+    monkeypatch.setattr(f1, "_send", lambda url, *args, **kwargs: sent.append(url) or send(url, *args, **kwargs))
+    monkeypatch.setattr(f1, "request_retries", 3)
+
+    assert not f1.download_torrent(f"{f1.SITE_URL}/torrent/download/{'A' * 40}", "Unavailable", tmp_path)
+    assert len(sent) == 4
+
+def test_missing_detail_page_is_dead_lettered_at_once(site, tmp_path):
+    state = CrawlState(tmp_path / "state.sqlite3")
+    try:
+        movie_url = f"{f1.SITE_URL}/movies/no-such-movie-2000"
+        assert f1.resolve_movie(movie_url, f1.CrawlStats(), state) is None
+        record = state.get(movie_url)
+        assert (record["state"], record["attempts"]) == (DEAD_LETTER, 1)
+        assert "404" in record["error"]
+    finally:
+        state.close()
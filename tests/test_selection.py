@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from parsers import extract_movie_details
+from selection import SelectionSpec
+
+ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.mark.parametrize("data, message", [
+    ({"genres": "animation"}, "genres must be a list of strings"),
+    ({"qualities": ["1080p", 720]}, "qualities must be a list of strings"),
+    ({"codecs": "x265"}, "codecs must be a list of strings"),
+    ({"min_rating": "7"}, "min_rating must be a number"),
+    ({"max_year": True}, "max_year must be a number"),
+    ({"genres": []}, "at least one genre"),
+    ({"quality": ["1080p"]}, "Unknown selection spec keys: quality"),
+])
+def test_malformed_spec_is_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        SelectionSpec.from_dict(data)
+
+def test_example_spec_loads():
+    spec = SelectionSpec.load(ROOT / "selection.example.json")
+    assert spec.codecs == ["x265", "x264"]
+    assert spec.min_rating == json.loads((ROOT / "selection.example.json").read_text())["min_rating"]
+
+def torrent(quality: str, codec: str, size_mb: float = 1000.0) -> dict:
+    return {"quality": quality, "codec": codec, "size_mb": size_mb, "url": f"{quality}-{codec}"}
+
+def test_quality_order_decides_before_codec_order():
+    spec = SelectionSpec.from_dict({"qualities": ["2160p", "1080p"], "codecs": ["x265", "x264"]})
+    options = [torrent("1080p", "x265"), torrent("2160p", "x264")]
+    assert spec.choose(options)["url"] == "2160p-x264"
+
+def test_codecs_are_ranked_in_the_order_listed():
+    options = [torrent("1080p", "x264"), torrent("1080p", "x265")]
+    assert SelectionSpec.from_dict({"codecs": ["x265", "x264"]}).choose(options)["url"] == "1080p-x265"
+    assert SelectionSpec.from_dict({"codecs": ["x264", "x265"]}).choose(options)["url"] == "1080p-x264"
+    assert SelectionSpec().choose(options)["url"] == "1080p-x264"  # Any codec: the first listed wins
+
+def test_filters_leave_nothing_to_choose():
+    spec = SelectionSpec.from_dict({"codecs": ["x265"], "max_size_mb": 1500})
+    assert spec.choose([torrent("1080p", "x264"), torrent("1080p", "x265", 2000.0), torrent("720p", "x265")]) is None
+
+def test_example_spec_picks_x265_for_toy_story():
+    page = (ROOT / "fixtures" / "toy-story-1995.html").read_bytes()
+    details = extract_movie_details(page, "https://yts.mx/movies/toy-story-1995", "html.parser")
+    spec = SelectionSpec.load(ROOT / "selection.example.json")
+    spec.qualities = ["1080p"]
+    chosen = spec.choose(details["torrents"])
+    assert (chosen["quality"], chosen["codec"]) == ("1080p", "x265")
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+import f1
+from mirrors import MirrorPool
+
+@pytest.fixture
+def torrent_site(mock_site, monkeypatch):
+    """The mock site wired into f1 as main would do it, with one of its torrents."""
+    server, base_url = mock_site
+    monkeypatch.setattr(f1, "mirrors", MirrorPool([base_url], f1.SITE_URL))
+    monkeypatch.setattr(f1, "chunk_size", 1024)
+    info_hash, torrent = next(iter(server.RequestHandlerClass.torrents.items()))
+    answers = []  # (Range header, status) of every torrent request
+    http_get = f1.http_get
+
+    def recording_get(url, **kwargs):
+        response = http_get(url, **kwargs)
+        answers.append((kwargs.get("headers", {}).get("Range"), response.status_code))
+        return response
+
+    monkeypatch.setattr(f1, "http_get", recording_get)
+    return f"{f1.SITE_URL}/torrent/download/{info_hash}", info_hash, torrent, answers
+
+def test_interrupted_download_resumes_with_a_range_request(torrent_site, tmp_path):
+    url, info_hash, torrent, answers = torrent_site
+    store = f1.get_torrent_store(tmp_path)
+    half = len(torrent) // 2
+    store.part_path(info_hash).write_bytes(torrent[:half])
+
+    assert f1.download_torrent(url, "Resumed", tmp_path)
+    assert answers == [(f"bytes={half}-", 206)]
+    assert (tmp_path / "Resumed.torrent").read_bytes() == torrent
+    assert not list(store.objects.glob("*.part"))
+
+def test_complete_part_file_is_stored_after_416(torrent_site, tmp_path):
+    url, info_hash, torrent, answers = torrent_site
+    store = f1.get_torrent_store(tmp_path)
+    store.part_path(info_hash).write_bytes(torrent)
+
+    assert f1.download_torrent(url, "Complete", tmp_path)
+    assert answers == [(f"bytes={len(torrent)}-", 416)]
+    assert store.lookup(info_hash) is not None
+
+def test_corrupt_download_is_discarded(torrent_site, tmp_path):
+    url, info_hash, torrent, answers = torrent_site
+    store = f1.get_torrent_store(tmp_path)
+    store.part_path(info_hash).write_bytes(b"garbage that is not the torrent's start")
+
+    assert not f1.download_torrent(url, "Corrupt", tmp_path)
+    assert store.lookup(info_hash) is None
+    assert not list(store.objects.glob("*.part"))  # Never resumed from again
+    assert f1.download_torrent(url, "Corrupt", tmp_path)
+
+def test_failed_download_leaves_its_part_file_for_the_next_run(torrent_site, tmp_path, monkeypatch):
+    url, info_hash, torrent, answers = torrent_site
+    store = f1.get_torrent_store(tmp_path)
+    store.part_path(info_hash).write_bytes(torrent[:100])
+    monkeypatch.setattr(f1, "request_retries", 0)
+
+    def cut_off(self, response):
+        raise f1.requests.exceptions.ConnectionError("Connection reset")
+
+    monkeypatch.setattr(f1.TorrentDownload, "accept", cut_off)
+
+    assert not f1.download_torrent(url, "Broken", tmp_path)
+    assert store.part_path(info_hash).read_bytes() == torrent[:100]
+
+@pytest.mark.mock_site(movies=3, latency=0.05)
+def test_concurrent_downloads_of_one_release_do_not_share_a_part_file(torrent_site, tmp_path):
+    url, info_hash, torrent, answers = torrent_site
+    store = f1.get_torrent_store(tmp_path)
+    store.part_path(info_hash).write_bytes(torrent[:len(torrent) // 2])
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(f1.download_torrent(url, f"Copy {i}", tmp_path)))
+               for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 6
+    assert store.object_path(info_hash).read_bytes() == torrent
+    assert sum(range_header is not None for range_header, status in answers) == 1  # Only one took over the part
+    assert not list(store.objects.glob("*.part"))
+
+def test_release_in_the_index_costs_no_request(torrent_site, tmp_path):
+    url, info_hash, torrent, answers = torrent_site
+    assert f1.download_torrent(url, "First Title", tmp_path)
+    assert f1.download_torrent(url, "Second Title", tmp_path)
+
+    assert len(answers) == 1
+    assert (tmp_path / "Second Title.torrent").read_bytes() == torrent
+    assert f1.get_torrent_store(tmp_path).manifest() == {"First Title.torrent": info_hash,
+                                                          "Second Title.torrent": info_hash}
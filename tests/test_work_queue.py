@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+import f1
+from crawl_state import DEAD_LETTER, CrawlState
+from work_queue import DONE, FAILED, LEASED, MOVIE_TASK, PAGE_TASK, PENDING, RedisWorkQueue, SqliteWorkQueue
+
+@pytest.fixture(params=["sqlite", "redis"])
+def open_queue(request, tmp_path, monkeypatch):
+    """Opens queues with the given lease and attempts on each backend; Redis runs on fakeredis."""
+    queues = []
+
+    def open_queue(lease_seconds: float, max_attempts: int):
+        if request.param == "sqlite":
+            queue = SqliteWorkQueue(tmp_path / "queue.sqlite3", lease_seconds, max_attempts)
+        else:
+            fakeredis = pytest.importorskip("fakeredis")
+            pytest.importorskip("lupa")  # The queue's moves are Lua scripts
+            import redis
+            server = fakeredis.FakeServer()
+            monkeypatch.setattr(redis.Redis, "from_url",
+                                lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+            queue = RedisWorkQueue("redis://localhost", lease_seconds, max_attempts)
+        queues.append(queue)
+        return queue
+
+    yield open_queue
+    for queue in queues:
+        queue.close()
+
+def test_expired_lease_is_handed_to_another_worker(open_queue):
+    queue = open_queue(lease_seconds=0.05, max_attempts=3)
+    queue.put(MOVIE_TASK, "https://yts.mx/movies/a")
+    [first] = queue.lease("worker-a")
+    time.sleep(0.1)
+    assert queue.heartbeat("worker-b") == 0
+    [second] = queue.lease("worker-b")
+    assert (second.key, second.attempts) == (first.key, 2)
+
+    # The first worker's late results are dropped; the task belongs to worker-b now
+    assert not queue.complete(first.key, "worker-a")
+    assert queue.fail(first.key, "too late", "worker-a") is None
+    assert queue.counts() == {LEASED: 1}
+    assert queue.complete(second.key, "worker-b")
+    assert queue.counts() == {DONE: 1}
+    assert queue.drained()
+
+def test_reclaimed_task_is_failed_after_max_attempts(open_queue):
+    queue = open_queue(lease_seconds=0.05, max_attempts=2)
+    queue.put(MOVIE_TASK, "https://yts.mx/movies/a")
+    queue.lease("worker-a")
+    time.sleep(0.1)
+    assert queue.reclaim_expired() == 1
+    assert queue.counts() == {PENDING: 1}
+    [task] = queue.lease("worker-b")
+    assert queue.fail(task.key, "still broken", "worker-b") == FAILED
+    assert queue.lease("worker-c") == []
+    assert queue.counts() == {FAILED: 1}
+
+def test_movies_are_leased_before_pages_and_failed_tasks_requeued(open_queue):
+    queue = open_queue(lease_seconds=60, max_attempts=3)
+    queue.put(PAGE_TASK, "https://yts.mx/browse?page=2", {"page": 2})
+    assert queue.put(MOVIE_TASK, "https://yts.mx/movies/a", {"title": "A"})
+    assert not queue.put(MOVIE_TASK, "https://yts.mx/movies/a")
+    movie, page = queue.lease("worker-a", limit=2)
+    assert (movie.kind, movie.payload, page.kind, page.payload) == (MOVIE_TASK, {"title": "A"}, PAGE_TASK, {"page": 2})
+
+    assert queue.fail(page.key, "page failed", "worker-a") == PENDING
+    assert queue.counts() == {PENDING: 1, LEASED: 1}
+    [again] = queue.lease("worker-b")
+    assert (again.key, again.kind, again.attempts) == (page.key, PAGE_TASK, 2)
+
+BROWSE_URL = f1.BROWSE_URL_TEMPLATE.format(genre="animation", order="downloads")
+
+def run_worker(base_url, tmp_path, *args):
+    """Seeds a queue with the first listing page and works on it until it is drained."""
+    queue_path = tmp_path / "queue.sqlite3"
+    queue = SqliteWorkQueue(queue_path)
+    queue.put(PAGE_TASK, BROWSE_URL, {"base": BROWSE_URL, "page": 1})
+    queue.close()
+    f1.main(["--site-url", base_url, "--max-rps", "0", "--progress-interval", "0", "--log-level", "ERROR",
+             "--role", "worker", "--queue", str(queue_path), "--workers", "1", *args])
+    queue = SqliteWorkQueue(queue_path)
+    try:
+        return {row["key"]: row["state"] for row in queue._conn.execute("SELECT key, state FROM tasks")}
+    finally:
+        queue.close()
+
+@pytest.mark.mock_site(movies=5)
+def test_dead_lettered_movie_is_not_handed_out_again(mock_site, tmp_path, monkeypatch):
+    server, base_url = mock_site
+    details = server.RequestHandlerClass.site.details
+    slug = next(iter(details))
+    del details[slug]
+    missing = f"{f1.SITE_URL}/movies/{slug}"
+    requested = []
+    http_get = f1.http_get
+    monkeypatch.setattr(f1, "http_get", lambda url, **kwargs: requested.append(url) or http_get(url, **kwargs))
+    monkeypatch.chdir(tmp_path)
+
+    states = run_worker(base_url, tmp_path, "--max-attempts", "5", "--no-cache")
+
+    assert requested.count(missing) == 1
+    assert states[missing] == DONE
+    state = CrawlState(tmp_path / "movies" / "crawl_state.sqlite3")
+    try:
+        assert state.get(missing)["state"] == DEAD_LETTER
+    finally:
+        state.close()
+
+@pytest.mark.mock_site(movies=45)
+def test_pages_after_one_that_gave_up_are_still_listed(mock_site, tmp_path, monkeypatch):
+    fetch_listing = f1.fetch_listing
+    monkeypatch.setattr(f1, "fetch_listing", lambda url, engine="html": (None, None) if url.endswith("page=2")
+                        else fetch_listing(url, engine))
+    monkeypatch.chdir(tmp_path)
+
+    states = run_worker(mock_site[1], tmp_path, "--max-attempts", "2")
+
+    pages = {key: state for key, state in states.items() if "/browse-movies/" in key}
+    assert pages == {f1.page_url(BROWSE_URL, 1): DONE, f1.page_url(BROWSE_URL, 2): FAILED,
+                     f1.page_url(BROWSE_URL, 3): DONE, f1.page_url(BROWSE_URL, 4): DONE}
+    assert sum(state == DONE for key, state in states.items() if "/movies/" in key) == 25
+    assert len(list((tmp_path / "movies").glob("*.torrent"))) == 25
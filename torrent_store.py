@@ -0,0 +1,145 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import bencode
+
+OBJECTS_FOLDER = "by-hash"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS torrents (
+    info_hash TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    source_url TEXT,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS title_links (
+    name TEXT PRIMARY KEY,
+    info_hash TEXT NOT NULL
+);
+"""
+
+def file_info_hash(path: Path) -> Optional[str]:
+    """Info-hash of a torrent file, or None if it is missing or not a valid torrent."""
+    try:
+        return bencode.info_hash(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+class TorrentStore:
+    """Content-addressed torrent files keyed by info-hash, with title-named links on top.
+
+    Each release is stored once as by-hash/<HASH>.torrent. The <title>.torrent files users see
+    are hard links (or copies where links are unsupported) listed in the index, which doubles
+    as the manifest. Distinct releases whose titles sanitize to the same name get the hash
+    appended instead of overwriting each other.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.objects = self.folder / OBJECTS_FOLDER
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.objects / "index.sqlite3"), check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def object_path(self, info_hash: str) -> Path:
+        return self.objects / f"{info_hash}.torrent"
+
+    def part_path(self, key: str) -> Path:
+        """Where an interrupted download for key (info-hash or title) waits to be resumed."""
+        return self.objects / f"{key}.part"
+
+    def claim_part(self, key: str) -> Path:
+        """A .part file only the calling download writes to, holding the interrupted download of key if any.
+
+        Workers downloading the same release each get their own file, so their writes cannot
+        interleave; the rename lets only one of them take over the transfer at part_path(key).
+        """
+        path = self.objects / f"{key}.{uuid.uuid4().hex}.part"
+        try:
+            os.rename(self.part_path(key), path)
+        except FileNotFoundError:
+            pass
+        return path
+
+    def release_part(self, key: str, path: Path) -> None:
+        """Leaves an unfinished claimed download at part_path(key) for the next download of key."""
+        try:
+            os.replace(path, self.part_path(key))
+        except FileNotFoundError:
+            pass  # Stored or discarded
+
+    def lookup(self, info_hash: str) -> Optional[Path]:
+        """Stored file for info_hash, checked without touching the network."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM torrents WHERE info_hash = ?", (info_hash,)).fetchone()
+        path = self.object_path(info_hash)
+        return path if row and path.exists() else None
+
+    def _record(self, info_hash: str, title: str, source_url: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO torrents (info_hash, title, source_url, stored_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(info_hash) DO NOTHING",
+                (info_hash, title, source_url, time.time()),
+            )
+            self._conn.commit()
+
+    def add(self, part_path: Path, info_hash: str, title: str, source_url: Optional[str] = None) -> Path:
+        """Moves a verified download into the store and returns its title link."""
+        os.replace(part_path, self.object_path(info_hash))
+        self._record(info_hash, title, source_url)
+        return self.link_title(info_hash, title)
+
+    def adopt(self, path: Path, info_hash: str, title: str) -> None:
+        """Indexes a title-named file downloaded before the store existed."""
+        obj = self.object_path(info_hash)
+        if not obj.exists():
+            self._link(path, obj)
+        self._record(info_hash, title, None)
+        self._record_link(path.name, info_hash)
+
+    def _link(self, source: Path, target: Path) -> None:
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+    def _record_link(self, name: str, info_hash: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO title_links (name, info_hash) VALUES (?, ?)", (name, info_hash))
+            self._conn.commit()
+
+    def link_title(self, info_hash: str, title: str) -> Path:
+        """Makes <title>.torrent point at the stored file, disambiguating title collisions."""
+        for name in (f"{title}.torrent", f"{title} [{info_hash[:8]}].torrent"):
+            path = self.folder / name
+            if path.exists():
+                existing_hash = file_info_hash(path)
+                if existing_hash == info_hash:
+                    self._record_link(name, info_hash)
+                    return path
+                if existing_hash is not None:
+                    continue  # A different release already owns this name
+                path.unlink()  # Damaged leftover from an interrupted old-style download
+            self._link(self.object_path(info_hash), path)
+            self._record_link(name, info_hash)
+            return path
+        raise FileExistsError(f"No free file name for {title} ({info_hash})")
+
+    def manifest(self) -> Dict[str, str]:
+        """Title file name to info-hash for every link the store created or adopted."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, info_hash FROM title_links ORDER BY name").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,332 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PAGE_TASK = "page"
+MOVIE_TASK = "movie"
+# Movies are handed out before pages, so pagination only runs ahead once the movies found so far are taken
+TASK_PRIORITY = {MOVIE_TASK: 0, PAGE_TASK: 1}
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE = 60.0  # Seconds a task stays with a worker that stops sending heartbeats
+DEFAULT_MAX_ATTEMPTS = 5
+
+# The Redis moves between the pending lists and the leases run as scripts, so that no key is ever
+# in neither place and counts() can not see the queue drained while a task is on its way back.
+# KEYS[1..3] are the leases zset and the owners and attempts hashes in every script.
+
+# Leases the head of pending list KEYS[4] to owner ARGV[1] until ARGV[2]; returns the key and its attempts.
+LEASE_SCRIPT = """
+local key = redis.call('LPOP', KEYS[4])
+if not key then return false end
+redis.call('ZADD', KEYS[1], ARGV[2], key)
+redis.call('HSET', KEYS[2], key, ARGV[1])
+return {key, redis.call('HINCRBY', KEYS[3], key, 1)}
+"""
+
+# Looks up the pending list of a task kind: ARGV[ARGV_KINDS..] name the kinds of lists KEYS[KEYS_PENDING..].
+PENDING_LIST = """
+local function pending_list(tasks, key, keys_pending, argv_kinds)
+    local kind = cjson.decode(redis.call('HGET', tasks, key) or '{}').kind
+    for i = keys_pending, #KEYS do
+        if ARGV[argv_kinds + i - keys_pending] == kind then return KEYS[i] end
+    end
+    return KEYS[keys_pending]
+end
+"""
+
+# Requeues, from the tasks hash KEYS[4] onto pending lists KEYS[5..], every lease that ran out by ARGV[1].
+RECLAIM_SCRIPT = PENDING_LIST + """
+local keys = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, key in ipairs(keys) do
+    redis.call('ZREM', KEYS[1], key)
+    redis.call('HDEL', KEYS[2], key)
+    redis.call('RPUSH', pending_list(KEYS[4], key, 5, 2), key)
+end
+return #keys
+"""
+
+# Ends owner ARGV[2]'s lease of ARGV[1], if it still has one. Taking the key out of the leases is
+# what makes the release win against reclaim_expired, which requeues only keys it took out itself.
+RELEASE = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return false end
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then return false end
+redis.call('HDEL', KEYS[2], ARGV[1])
+"""
+
+# Releases ARGV[1] and counts it in KEYS[5] after dropping it from the tasks hash KEYS[4].
+COMPLETE_SCRIPT = RELEASE + """
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+redis.call('INCR', KEYS[5])
+return 1
+"""
+
+# Releases ARGV[1] and, after ARGV[4] attempts, moves it with error ARGV[3] from the tasks hash KEYS[4]
+# to the failed hash KEYS[5]; otherwise it goes back on its pending list among KEYS[6..].
+FAIL_SCRIPT = PENDING_LIST + RELEASE + """
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') >= tonumber(ARGV[4]) then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('HDEL', KEYS[4], ARGV[1])
+    redis.call('HSET', KEYS[5], ARGV[1], ARGV[3])
+    return 'failed'
+end
+redis.call('RPUSH', pending_list(KEYS[4], ARGV[1], 6, 5), ARGV[1])
+return 'pending'
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT,
+    state TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, priority, created_at);
+"""
+
+@dataclass
+class Task:
+    key: str  # The URL; adding a key twice is a no-op, which deduplicates across workers
+    kind: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0  # Leases so far, this one included
+
+class SqliteWorkQueue:
+    """Work queue shared by processes through one SQLite file, on one machine or a shared disk.
+
+    Workers lease tasks for lease_seconds and keep their leases alive with heartbeat(); leases
+    of a worker that died run out and the tasks are handed to the next worker asking for work.
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level=None leaves transactions to the explicit BEGIN IMMEDIATE below
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def put(self, kind: str, key: str, payload: Optional[Dict[str, Any]] = None) -> bool:
+        """Adds a task; returns False if the key was added before, by anyone."""
+        now = time.time()
+        cursor = self._transaction(
+            "INSERT OR IGNORE INTO tasks (key, kind, priority, payload, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, TASK_PRIORITY.get(kind, 0), json.dumps(payload or {}), PENDING, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def lease(self, owner: str, limit: int = 1) -> List[Task]:
+        """Hands out up to limit pending tasks, or tasks whose lease ran out, to owner."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # Two workers must never lease the same row
+            try:
+                rows = self._conn.execute(
+                    "SELECT key, kind, payload, attempts FROM tasks "
+                    "WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                    "ORDER BY priority, created_at LIMIT ?",
+                    (PENDING, LEASED, now, limit),
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE tasks SET state = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE key = ?",
+                        (LEASED, owner, now + self.lease_seconds, now, row["key"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [Task(row["key"], row["kind"], json.loads(row["payload"] or "{}"), row["attempts"] + 1) for row in rows]
+
+    def heartbeat(self, owner: str) -> int:
+        """Extends every lease owner holds; returns how many it holds."""
+        now = time.time()
+        cursor = self._transaction(
+            "UPDATE tasks SET lease_expires = ? WHERE state = ? AND owner = ?",
+            (now + self.lease_seconds, LEASED, owner),
+        )
+        return cursor.rowcount
+
+    def reclaim_expired(self) -> int:
+        """Returns tasks whose lease ran out to the pending pool; workers also take them directly."""
+        now = time.time()
+        cursor = self._transaction(
+            "UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE state = ? AND lease_expires < ?",
+            (PENDING, now, LEASED, now),
+        )
+        return cursor.rowcount
+
+    def complete(self, key: str, owner: str) -> bool:
+        """Marks a task done; False if owner no longer holds its lease, which leaves it to the new holder."""
+        cursor = self._transaction("UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL, error = NULL, "
+                                   "updated_at = ? WHERE key = ? AND owner = ? AND state = ?",
+                                   (DONE, time.time(), key, owner, LEASED))
+        return cursor.rowcount == 1
+
+    def fail(self, key: str, error: str, owner: str) -> Optional[str]:
+        """Puts a failed task back for another worker, or gives up on it after max_attempts leases.
+
+        Returns the task's new state, or None if owner no longer holds its lease.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM tasks WHERE key = ? AND owner = ? AND state = ?",
+                                     (key, owner, LEASED)).fetchone()
+            if row is None:
+                return None
+            state = FAILED if row["attempts"] >= self.max_attempts else PENDING
+            self._conn.execute("UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL, error = ?, "
+                               "updated_at = ? WHERE key = ? AND owner = ? AND state = ?",
+                               (state, error, time.time(), key, owner, LEASED))
+        return state
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._transaction("SELECT state, COUNT(*) AS n FROM tasks GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def drained(self) -> bool:
+        """True once tasks were added and none is pending or leased any more."""
+        counts = self.counts()
+        return bool(counts) and not counts.get(PENDING) and not counts.get(LEASED)
+
+    def reset(self) -> None:
+        """Forgets every task, so the next crawl starts from scratch."""
+        self._transaction("DELETE FROM tasks")
+
+class RedisWorkQueue:
+    """The same queue on a Redis server, for workers on machines without a shared disk.
+
+    Needs the optional redis package. Pending keys sit in one list per task kind, leases in a
+    sorted set scored by expiry time, and every key ever added in a set that provides dedup.
+    """
+
+    def __init__(self, url: str, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 prefix: str = "yts:queue:"):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("A Redis work queue needs the redis package (pip install redis)") from None
+        self.url = url
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._lease_script = self._redis.register_script(LEASE_SCRIPT)
+        self._reclaim_script = self._redis.register_script(RECLAIM_SCRIPT)
+        self._complete_script = self._redis.register_script(COMPLETE_SCRIPT)
+        self._fail_script = self._redis.register_script(FAIL_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return self.prefix + name
+
+    def describe(self) -> str:
+        return self.url
+
+    def close(self) -> None:
+        self._redis.close()
+
+    def put(self, kind: str, key: str, payload: Optional[Dict[str, Any]] = None) -> bool:
+        if not self._redis.sadd(self._key("seen"), key):
+            return False
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key("tasks"), key, json.dumps({"kind": kind, "payload": payload or {}}))
+        pipe.rpush(self._key(f"pending:{kind}"), key)
+        pipe.execute()
+        return True
+
+    def _lease_keys(self) -> List[str]:
+        return [self._key("leases"), self._key("owners"), self._key("attempts")]
+
+    def _pending_keys(self) -> List[str]:
+        return [self._key(f"pending:{kind}") for kind in TASK_PRIORITY]
+
+    def lease(self, owner: str, limit: int = 1) -> List[Task]:
+        self.reclaim_expired()
+        tasks = []
+        for kind in sorted(TASK_PRIORITY, key=TASK_PRIORITY.get):
+            while len(tasks) < limit:
+                leased = self._lease_script(keys=self._lease_keys() + [self._key(f"pending:{kind}")],
+                                            args=[owner, time.time() + self.lease_seconds])
+                if leased is None:
+                    break
+                key, attempts = leased
+                entry = json.loads(self._redis.hget(self._key("tasks"), key) or "{}")
+                tasks.append(Task(key, kind, entry.get("payload") or {}, int(attempts)))
+        return tasks
+
+    def heartbeat(self, owner: str) -> int:
+        keys = [key for key, holder in self._redis.hgetall(self._key("owners")).items() if holder == owner]
+        if keys:
+            expires = time.time() + self.lease_seconds
+            self._redis.zadd(self._key("leases"), {key: expires for key in keys}, xx=True)
+        return len(keys)
+
+    def reclaim_expired(self) -> int:
+        return self._reclaim_script(keys=self._lease_keys() + [self._key("tasks")] + self._pending_keys(),
+                                    args=[time.time(), *TASK_PRIORITY])
+
+    def complete(self, key: str, owner: str) -> bool:
+        return bool(self._complete_script(keys=self._lease_keys() + [self._key("tasks"), self._key("done")],
+                                          args=[key, owner]))
+
+    def fail(self, key: str, error: str, owner: str) -> Optional[str]:
+        return self._fail_script(
+            keys=self._lease_keys() + [self._key("tasks"), self._key("failed")] + self._pending_keys(),
+            args=[key, owner, error, self.max_attempts, *TASK_PRIORITY])
+
+    def counts(self) -> Dict[str, int]:
+        counts = {
+            PENDING: sum(self._redis.llen(self._key(f"pending:{kind}")) for kind in TASK_PRIORITY),
+            LEASED: self._redis.zcard(self._key("leases")),
+            DONE: int(self._redis.get(self._key("done")) or 0),
+            FAILED: self._redis.hlen(self._key("failed")),
+        }
+        return {state: count for state, count in counts.items() if count}
+
+    def drained(self) -> bool:
+        counts = self.counts()
+        return bool(counts) and not counts.get(PENDING) and not counts.get(LEASED)
+
+    def reset(self) -> None:
+        keys = list(self._redis.scan_iter(self.prefix + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+def open_work_queue(spec: str, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """A Redis queue for redis:// URLs, otherwise a SQLite queue at the given path."""
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue(spec, lease_seconds, max_attempts)
+    return SqliteWorkQueue(Path(spec), lease_seconds, max_attempts)
@@ -0,0 +1,46 @@
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+
+API_URL = "https://yts.mx/api/v2/list_movies.json"
+PAGE_LIMIT = 50  # Largest page size the API accepts
+
+# Browse page orderings and the API sort keys they correspond to
+SORT_BY = {"downloads": "download_count", "latest": "date_added"}
+
+def list_movies_url(genre: str, order: str, api_url: str = API_URL, limit: int = PAGE_LIMIT) -> str:
+    """Builds the first list_movies page URL; later pages append &page=N."""
+    query = {"genre": genre, "sort_by": SORT_BY.get(order, order), "order_by": "desc", "limit": limit}
+    return f"{api_url}?{urlencode(query)}"
+
+def parse_list_movies(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Returns the movie objects of a list_movies response, raising ValueError on an API error."""
+    if payload.get("status") != "ok":
+        raise ValueError(f"API error: {payload.get('status_message', 'unknown error')}")
+    return payload.get("data", {}).get("movies") or []
+
+def movie_details(movie: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps an API movie object to the same record extract_movie_details builds from HTML."""
+    torrents = []
+    for torrent in movie.get("torrents") or []:
+        if not torrent.get("url"):
+            continue
+        size_bytes = torrent.get("size_bytes")
+        torrents.append({
+            "quality": (torrent.get("quality") or "").lower(),
+            "codec": (torrent.get("video_codec") or "x264").lower(),
+            "type": torrent.get("type"),
+            "size_mb": round(size_bytes / (1024 * 1024), 2) if size_bytes else None,
+            "seeds": torrent.get("seeds"),
+            "peers": torrent.get("peers"),
+            "url": torrent["url"],
+            "hash": (torrent.get("hash") or "").upper() or None,
+            "trackers": [],
+        })
+    return {
+        "title": movie.get("title"),
+        "year": movie.get("year"),
+        "rating": movie.get("rating"),
+        "genres": movie.get("genres") or [],
+        "runtime": movie.get("runtime") or None,
+        "torrents": torrents,
+    }